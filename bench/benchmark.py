@@ -0,0 +1,97 @@
+"""
+Times end-to-end runs of the scripts against the local mock Canvas server
+
+    python bench/benchmark.py --courses 10 --students 20 --latency 0.05 --profile fast
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+import tempfile
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from mock_canvas import serve, Config, ACCOUNT, QUIZ
+from utils.driver import Driver
+from utils.utils import login, Assignment, Student
+from utils.courses.courses import CollegeCourse
+import accommodate
+import download
+import survey
+import regrade
+
+
+def bench_accommodate(driver, url, _range, canvas, api):
+    assignments = [Assignment(QUIZ, 60)]
+    students = {course.name: [Student(first, last, 1.5) for _, first, last in course.students] for course in canvas.courses.values()}
+    accommodate.run(driver, url, students, assignments, _range, CollegeCourse(), api=api)
+
+    return sum(len(course.students) for course in canvas.courses.values())
+
+
+def bench_download(driver, url, _range, canvas, api):
+    download.run(driver, url, _range, CollegeCourse(), api=api)
+
+    return len(canvas.courses)
+
+
+def bench_survey(driver, url, _range, canvas, api):
+    inputs = {'url': 'https://example.qualtrics.com', 'intro': 'intro', 'finish': 'finish'}
+    survey.run(driver, url, inputs, _range, CollegeCourse(), api=api)
+
+    return len(canvas.courses)
+
+
+def bench_regrade(driver, url, _range, canvas, api):
+    for link in CollegeCourse().get_links(driver, url, _range, api=api):
+        num_students = regrade.access_assignment(driver, f"{link.link}/assignments")
+        regrade.run(driver, num_students)
+        driver.close()
+        driver.switch_to.window(driver.main_window)
+
+    return sum(len(course.students) for course in canvas.courses.values())
+
+
+BENCHMARKS = {
+    'accommodate': bench_accommodate,
+    'download': bench_download,
+    'survey': bench_survey,
+    'regrade': bench_regrade,
+}
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--courses', type=int, default=10)
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--profile', default='default')
+    parser.add_argument('--api', action='store_true', help='discover every course through the api, the page range is ignored')
+    parser.add_argument('scripts', nargs='*', default=list(BENCHMARKS))
+    args = parser.parse_args()
+
+    print(f"{'script':<14}{'seconds':>10}{'items':>8}{'items/s':>10}{'requests':>10}")
+    for name in args.scripts:
+        # fresh server state per script so runs don't affect each other
+        config = Config(courses=args.courses, students=args.students, latency=args.latency)
+        server, canvas = serve(config)
+        url = f"http://127.0.0.1:{server.server_port}/accounts/{ACCOUNT}?"
+        _range = range(1, (args.courses - 1) // config.page_size + 2)
+
+        driver = Driver.initialize(tempfile.mkdtemp(), args.profile)
+        try:
+            login(driver, url)
+            requests = canvas.requests
+
+            start = perf_counter()
+            items = BENCHMARKS[name](driver, url, _range, canvas, args.api)
+            elapsed = perf_counter() - start
+        finally:
+            driver.quit()
+            server.shutdown()
+
+        print(f"{name:<14}{elapsed:>10.2f}{items:>8}{items / elapsed:>10.2f}{canvas.requests - requests:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+"""
+Local stand-in for the Canvas pages and api endpoints the scripts drive, for benchmarking without production
+"""
+from typing import Dict, List, Tuple
+from dataclasses import dataclass, field
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from threading import Thread
+from time import sleep, time
+import random
+import json
+import re
+
+
+ACCOUNT = '169964'
+SURVEY = 'Student Perspective Survey Fall 1'
+REGRADE = 'Quiz 7 & 8'
+QUIZ = 'Exam Unit 3: Part 2'
+
+
+@dataclass
+class Config:
+    courses: int = 10
+    students: int = 20
+    page_size: int = 15
+    latency: float = 0.0
+    submission_rate: float = 0.8
+    export_delay: float = 0.5
+    seed: int = 0
+
+
+@dataclass
+class Submission:
+    id: int
+    user_id: int
+    question_points: int
+    score: float
+    fudge_points: float = 0.0
+
+
+@dataclass
+class MockCourse:
+    id: int
+    name: str
+    students: List[Tuple[int, str, str]]
+    submissions: Dict[int, Submission] = field(default_factory=dict)
+    extensions: Dict[Tuple[int, int], int] = field(default_factory=dict)
+
+    @property
+    def quiz_id(self) -> int:
+        return self.id * 10 + 1
+
+    @property
+    def regrade_quiz_id(self) -> int:
+        return self.id * 10 + 2
+
+    @property
+    def question_id(self) -> int:
+        return self.id * 10 + 3
+
+
+class MockCanvas:
+    def __init__(self, config: Config):
+        self.config = config
+        self.courses: Dict[int, MockCourse] = {}
+        self.exports: Dict[int, Tuple[int, float]] = {}
+        self.requests = 0
+        # status codes to answer the next requests with instead of handling them, e.g. [503, 429]
+        self.faults: List[int] = []
+
+        rng = random.Random(config.seed)
+        for i in range(config.courses):
+            course_id = 1000000 + i
+            students = [(course_id * 1000 + j, f"First{j}", f"Last{j}") for j in range(config.students)]
+            course = MockCourse(id=course_id, name=f"UT COLLEGE Course {i:03d}", students=students)
+            for user_id, _, _ in students:
+                if rng.random() < config.submission_rate:
+                    course.submissions[user_id] = Submission(id=user_id, user_id=user_id, question_points=rng.choice([0, 1]), score=float(rng.randint(10, 90)))
+            self.courses[course_id] = course
+
+    def student_index(self, course: MockCourse, search: str) -> List[Tuple[int, str, str]]:
+        return [student for student in course.students if search.lower() in f"{student[1]} {student[2]}".lower()]
+
+
+def page(body: str) -> str:
+    return f"<!DOCTYPE html><html><head><title>Canvas</title></head><body>{body}</body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    canvas: MockCanvas = None
+
+    def log_message(self, *args):
+        pass
+
+    # responses
+
+    def send(self, body, status=200, content_type='text/html', headers=None):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, data, headers=None):
+        self.send(json.dumps(data), content_type='application/json', headers=headers)
+
+    def send_paginated(self, items: List):
+        per_page = int(self.query.get('per_page', ['10'])[0])
+        current = int(self.query.get('page', ['1'])[0])
+        headers = {}
+        if current * per_page < len(items):
+            query = {key: values[0] for key, values in self.query.items()}
+            query.update(page=current + 1, per_page=per_page)
+            params = '&'.join(f"{key}={value}" for key, value in query.items())
+            headers['Link'] = f'<http://{self.headers["Host"]}{self.path_only}?{params}>; rel="next"'
+        self.send_json(items[(current - 1) * per_page:current * per_page], headers)
+
+    def redirect(self, location):
+        self.send_response(303)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode() if length else ''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw or '{}')
+        return {key: values[0] for key, values in parse_qs(raw).items()}
+
+    # routing
+
+    def handle_method(self, method):
+        self.canvas.requests += 1
+        if self.canvas.config.latency:
+            sleep(self.canvas.config.latency)
+
+        if self.canvas.faults:
+            # canvas signals throttling with a 403 or a 429, anything else is a plain server error
+            status = self.canvas.faults.pop(0)
+            return self.send('403 Forbidden (Rate Limit Exceeded)' if status == 403 else 'Error', status=status, content_type='text/plain')
+
+        parsed = urlparse(self.path)
+        self.path_only = parsed.path
+        self.query = parse_qs(parsed.query)
+
+        for pattern, route_method, handler in ROUTES:
+            match = re.fullmatch(pattern, parsed.path)
+            if match and route_method == method:
+                try:
+                    return handler(self, *match.groups())
+                except KeyError:
+                    # an unknown course, export or student
+                    return self.send(page("Not found"), status=404)
+
+        self.send(page("Not found"), status=404)
+
+    def do_GET(self):
+        self.handle_method('GET')
+
+    def do_POST(self):
+        self.handle_method('POST')
+
+    def do_PUT(self):
+        self.handle_method('PUT')
+
+    def course(self, course_id) -> MockCourse:
+        return self.canvas.courses[int(course_id)]
+
+    # pages
+
+    def account(self, account):
+        current = int(self.query.get('page', ['1'])[0])
+        size = self.canvas.config.page_size
+        courses = list(self.canvas.courses.values())[(current - 1) * size:current * size]
+        rows = ''.join(f'<tr><td><a href="http://{self.headers["Host"]}/courses/{course.id}"><span>{course.name}</span></a></td></tr>' for course in courses)
+        self.send(page(f'<table><tbody>{rows}</tbody></table>'))
+
+    def quizzes(self, course_id):
+        course = self.course(course_id)
+        self.send(page(
+            '<h2 aria-controls="assignment-quizzes">Assignment Quizzes</h2>'
+            f'<a href="/courses/{course.id}/quizzes/{course.quiz_id}">{QUIZ}</a>'
+            f'<a href="/courses/{course.id}/quizzes/{course.regrade_quiz_id}">{REGRADE}</a>'
+        ))
+
+    def moderate(self, course_id, quiz_id):
+        course = self.course(course_id)
+        search = self.query.get('search_term', [''])[0]
+        students = self.canvas.student_index(course, search) if search else course.students
+        user_id = students[0][0] if students else 0
+        self.send(page(
+            '<form method="get"><input id="search_term" name="search_term" type="text"><input type="submit" value="Filter"></form>'
+            '<i onclick="document.getElementById(\'extensions\').style.display=\'block\'"><span>Change user extensions</span></i>'
+            f'<form id="extensions" method="post" style="display:none"><input type="hidden" name="user_id" value="{user_id}">'
+            '<input id="extension_extra_time" name="extra_time" type="text"><button type="submit"><span>Save</span></button></form>'
+        ))
+
+    def save_extension(self, course_id, quiz_id):
+        data = self.body()
+        self.course(course_id).extensions[(int(quiz_id), int(data['user_id']))] = int(data.get('extra_time') or 0)
+        self.redirect(self.path)
+
+    def gradebook(self, course_id):
+        self.send(page(
+            '<span data-component="ActionMenu" onclick="document.getElementById(\'menu\').style.display=\'block\'">Actions</span>'
+            f'<div id="menu" style="display:none"><span onclick="window.location=\'/courses/{course_id}/gradebook.csv\'">Export</span></div>'
+        ))
+
+    def gradebook_csv(self, course_id):
+        course = self.course(course_id)
+        rows = ["Student,ID,Score"] + [f"{last} {first},{user_id},{course.submissions[user_id].score if user_id in course.submissions else ''}" for user_id, first, last in course.students]
+        filename = f"{int(time())}_Grades-{course.name.replace(' ', '_')}.csv"
+        self.send("\n".join(rows), content_type='text/csv', headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+    def assignments(self, course_id):
+        course = self.course(course_id)
+        self.send(page(
+            f'<a href="/courses/{course.id}/assignments/survey">{SURVEY}</a>'
+            f'<a href="/courses/{course.id}/assignments/regrade">{REGRADE}</a>'
+        ))
+
+    def survey(self, course_id):
+        self.send(page(f'<button onclick="window.open(\'/courses/{course_id}/survey_form\')">Load Student Perspective Survey</button>'))
+
+    def survey_form(self, course_id):
+        editor = "<body contenteditable='true'></body>"
+        self.send(page(
+            '<form method="post"><input name="url" type="text">'
+            f'<iframe id="intro_text_ifr" srcdoc="{editor}"></iframe><iframe id="finish_text_ifr" srcdoc="{editor}"></iframe>'
+            '<button type="submit">Save</button></form>'
+        ))
+
+    def save_survey(self, course_id):
+        self.send(page('Saved'))
+
+    def regrade_assignment(self, course_id):
+        self.send(page(f'<a href="/courses/{course_id}/gradebook/speed_grader?assignment_id={self.course(course_id).regrade_quiz_id}&student=0" target="_blank"><i><span>SpeedGrader</span></i></a>'))
+
+    def speed_grader(self, course_id):
+        course = self.course(course_id)
+        assignment_id = self.query.get('assignment_id', [''])[0]
+        if 'student_id' in self.query:
+            user_id = int(self.query['student_id'][0])
+            index = next(i for i, student in enumerate(course.students) if student[0] == user_id)
+        else:
+            index = int(self.query.get('student', ['0'])[0])
+        user_id = course.students[index][0]
+        following = min(index + 1, len(course.students) - 1)
+
+        if user_id in course.submissions:
+            content = f'<iframe id="speedgrader_iframe" src="/courses/{course.id}/speed_grader_iframe?student_id={user_id}"></iframe>'
+        else:
+            content = '<div id="this_student_does_not_have_a_submission" style="display: block;">This student does not have a submission</div>'
+
+        self.send(page(
+            '<a id="students_selectmenu-button" href="#">Show all sections</a>'
+            f'<div id="x_of_x_students_frd">{index + 1}/{len(course.students)}</div>'
+            f'<i class="icon-arrow-right next" onclick="window.location=\'/courses/{course.id}/gradebook/speed_grader?assignment_id={assignment_id}&student={following}\'">Next</i>'
+            f'{content}'
+        ))
+
+    def speed_grader_iframe(self, course_id):
+        submission = self.course(course_id).submissions[int(self.query['student_id'][0])]
+        self.send(page(
+            '<div><div><span>Question 1</span></div>'
+            f'<div class="header"><span><div class="user_points"><input class="question_input" value="{submission.question_points}"></div></span></div></div>'
+            f'<span class="score_value">{submission.score + submission.fudge_points}</span>'
+            f'<form method="post"><input type="hidden" name="student_id" value="{submission.user_id}">'
+            f'<input id="fudge_points_entry" name="fudge_points" value="{submission.fudge_points or ""}">'
+            '<button class="btn btn-primary update-scores" type="submit">Update Scores</button></form>'
+        ))
+
+    def save_grade(self, course_id):
+        data = self.body()
+        self.course(course_id).submissions[int(data['student_id'])].fudge_points = float(data.get('fudge_points') or 0)
+        self.send(page('Saved'))
+
+    # api
+
+    def api_account_courses(self, account):
+        search = self.query.get('search_term', [''])[0]
+        self.send_paginated([{'id': course.id, 'name': course.name} for course in self.canvas.courses.values() if search in course.name])
+
+    def api_users(self, course_id):
+        self.send_paginated([{'id': user_id, 'name': f"{first} {last}", 'sortable_name': f"{last}, {first}"} for user_id, first, last in self.course(course_id).students])
+
+    def api_extensions(self, course_id, quiz_id):
+        course = self.course(course_id)
+        extensions = self.body()['quiz_extensions']
+        for extension in extensions:
+            course.extensions[(int(quiz_id), int(extension['user_id']))] = int(extension['extra_time'])
+        self.send_json({'quiz_extensions': extensions})
+
+    def api_quizzes(self, course_id):
+        course = self.course(course_id)
+        search = self.query.get('search_term', [''])[0]
+        quizzes = [
+            {'id': course.quiz_id, 'title': QUIZ, 'assignment_id': course.quiz_id},
+            {'id': course.regrade_quiz_id, 'title': REGRADE, 'assignment_id': course.regrade_quiz_id},
+        ]
+        self.send_paginated([quiz for quiz in quizzes if search in quiz['title']])
+
+    def api_questions(self, course_id, quiz_id):
+        self.send_paginated([{'id': self.course(course_id).question_id, 'position': 1}])
+
+    def api_quiz_submissions(self, course_id, quiz_id):
+        course = self.course(course_id)
+        submissions = [
+            {'id': submission.id, 'user_id': submission.user_id, 'attempt': 1, 'workflow_state': 'complete',
+             'score': submission.score + submission.fudge_points, 'fudge_points': submission.fudge_points,
+             'extra_time': course.extensions.get((int(quiz_id), submission.user_id))}
+            for submission in course.submissions.values()
+        ]
+        # setting an extension creates a settings only submission for students who haven't started
+        submissions += [
+            {'id': user_id, 'user_id': user_id, 'attempt': None, 'workflow_state': 'settings_only', 'score': None, 'fudge_points': None, 'extra_time': extra_time}
+            for (quiz, user_id), extra_time in course.extensions.items()
+            if quiz == int(quiz_id) and user_id not in course.submissions
+        ]
+        self.send_paginated(submissions)
+
+    def api_assignment_submissions(self, course_id, assignment_id):
+        course = self.course(course_id)
+        submissions = []
+        for user_id, _, _ in course.students:
+            submission = course.submissions.get(user_id)
+            if submission is None:
+                submissions.append({'user_id': user_id, 'workflow_state': 'unsubmitted', 'submission_history': []})
+                continue
+            history = [{'attempt': 1, 'submission_data': [{'question_id': course.question_id, 'points': submission.question_points}]}]
+            submissions.append({'user_id': user_id, 'workflow_state': 'graded', 'submission_history': history})
+        self.send_paginated(submissions)
+
+    def api_update_quiz_submission(self, course_id, quiz_id, submission_id):
+        update = self.body()['quiz_submissions'][0]
+        self.course(course_id).submissions[int(submission_id)].fudge_points = float(update['fudge_points'])
+        self.send_json({'quiz_submissions': []})
+
+    def start_export(self, course_id):
+        export_id = len(self.canvas.exports) + 1
+        self.canvas.exports[export_id] = (int(course_id), time())
+        self.send_json({'progress_id': export_id, 'attachment_id': export_id})
+
+    def api_progress(self, export_id):
+        _, started = self.canvas.exports[int(export_id)]
+        done = time() - started >= self.canvas.config.export_delay
+        self.send_json({'id': int(export_id), 'workflow_state': 'completed' if done else 'running'})
+
+    def api_file(self, export_id):
+        self.send_json({'id': int(export_id), 'url': f'http://{self.headers["Host"]}/files/{export_id}/download'})
+
+    def file_download(self, export_id):
+        course_id, _ = self.canvas.exports[int(export_id)]
+        self.gradebook_csv(course_id)
+
+
+ROUTES = [
+    (r'/accounts/(\d+)', 'GET', Handler.account),
+    (r'/courses/(\d+)/quizzes', 'GET', Handler.quizzes),
+    (r'/courses/(\d+)/quizzes/(\d+)/moderate', 'GET', Handler.moderate),
+    (r'/courses/(\d+)/quizzes/(\d+)/moderate', 'POST', Handler.save_extension),
+    (r'/courses/(\d+)/gradebook', 'GET', Handler.gradebook),
+    (r'/courses/(\d+)/gradebook\.csv', 'GET', Handler.gradebook_csv),
+    (r'/courses/(\d+)/gradebook_csv', 'POST', Handler.start_export),
+    (r'/courses/(\d+)/assignments', 'GET', Handler.assignments),
+    (r'/courses/(\d+)/assignments/survey', 'GET', Handler.survey),
+    (r'/courses/(\d+)/survey_form', 'GET', Handler.survey_form),
+    (r'/courses/(\d+)/survey_form', 'POST', Handler.save_survey),
+    (r'/courses/(\d+)/assignments/regrade', 'GET', Handler.regrade_assignment),
+    (r'/courses/(\d+)/gradebook/speed_grader', 'GET', Handler.speed_grader),
+    (r'/courses/(\d+)/speed_grader_iframe', 'GET', Handler.speed_grader_iframe),
+    (r'/courses/(\d+)/speed_grader_iframe', 'POST', Handler.save_grade),
+    (r'/api/v1/accounts/(\d+)/courses', 'GET', Handler.api_account_courses),
+    (r'/api/v1/courses/(\d+)/users', 'GET', Handler.api_users),
+    (r'/api/v1/courses/(\d+)/quizzes', 'GET', Handler.api_quizzes),
+    (r'/api/v1/courses/(\d+)/quizzes/(\d+)/extensions', 'POST', Handler.api_extensions),
+    (r'/api/v1/courses/(\d+)/quizzes/(\d+)/questions', 'GET', Handler.api_questions),
+    (r'/api/v1/courses/(\d+)/quizzes/(\d+)/submissions', 'GET', Handler.api_quiz_submissions),
+    (r'/api/v1/courses/(\d+)/quizzes/(\d+)/submissions/(\d+)', 'PUT', Handler.api_update_quiz_submission),
+    (r'/api/v1/courses/(\d+)/assignments/(\d+)/submissions', 'GET', Handler.api_assignment_submissions),
+    (r'/api/v1/progress/(\d+)', 'GET', Handler.api_progress),
+    (r'/api/v1/files/(\d+)', 'GET', Handler.api_file),
+    (r'/files/(\d+)/download', 'GET', Handler.file_download),
+]
+
+
+def serve(config: Config, port: int = 0) -> Tuple['ThreadingHTTPServer', MockCanvas]:
+    """
+    Starts the mock server in a background thread, returns the server and its state
+    """
+    canvas = MockCanvas(config)
+    handler = type('MockCanvasHandler', (Handler,), {'canvas': canvas})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, canvas
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser()
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--courses', type=int, default=10)
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    canvas = MockCanvas(Config(courses=args.courses, students=args.students, latency=args.latency))
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), type('MockCanvasHandler', (Handler,), {'canvas': canvas}))
+    print(f"Mock Canvas serving http://127.0.0.1:{server.server_port}/accounts/{ACCOUNT}?")
+    server.serve_forever()
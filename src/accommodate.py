@@ -1,12 +1,22 @@
 from typing import List, Tuple, Dict
-from utils.utils import login, get_students, get_course_type, get_unit_number, get_assignments, get_range
+from dataclasses import dataclass, field
+from utils.utils import add_run_arguments, start_run, finish_run, get_quarantine, use_course_index, get_students, get_course_type, get_unit_number, get_assignments, get_range
 from utils.driver import Driver
+from utils.pool import run_pool, run_course
+from utils.journal import open_journal
+from utils.canvas import get_student_ids, add_quiz_extensions, get_quiz_extensions, normalize_name
+from utils.trace import WebDriverWait
+from utils.extract import LinkIndex
 from argparse import ArgumentParser
 from math import ceil
 
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+
+def get_extra_time(duration: int, multiplier: float) -> int:
+    return int(ceil(duration * multiplier - duration))
 
 
 def add_extensions(driver: 'Driver', extra_time: int) -> None:
@@ -23,39 +33,130 @@ def add_extensions(driver: 'Driver', extra_time: int) -> None:
     driver.find_element_by_xpath("//button/span[contains(text(), 'Save')]/..").click()
 
 
-def add_accommodations(driver: 'Driver', assignment_links: List['str'], assignments: List['Assignment'], students: List['Student']) -> None:
+def add_accommodations(driver: 'Driver', course_link: 'CourseDescriptor', assignment_links: List['str'], assignments: List['Assignment'], students: List['Student'], journal: 'Journal' = None) -> None:
     """
     Goes through all students who need accommodations and adds extra time using the add_extensions helper function
     """
+    quarantine = get_quarantine(driver)
+
     # loop through all assignments
     for assignment, link in zip(assignments, assignment_links):
-        # go to exam
-        driver.get(f"{link}/moderate")
+        def open_moderate() -> None:
+            # go to exam
+            driver.get(f"{link}/moderate")
 
-        # calculate extra time
-        get_extra_time = lambda duration, multiplier: int(ceil(duration * multiplier - duration))
+            # get utils
+            WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//input[@name='search_term']")))
 
-        # get utils
-        WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//input[@name='search_term']")))
+        open_moderate()
 
         # loop through students
         for student in students:
-            # get utils
-            input_box = driver.find_element_by_xpath("//input[@id='search_term']")
-            submit = driver.find_element_by_xpath("//input[@value='Filter']")
+            # skip students finished by an earlier run
+            if journal is not None and (link, 'accommodate', student.first, student.last) in journal:
+                continue
+            if not quarantine.selected(course_link.link, 'accommodate', assignment.name, student.first, student.last):
+                continue
+
+            def accommodate_student() -> None:
+                # get utils
+                input_box = driver.find_element_by_xpath("//input[@id='search_term']")
+                submit = driver.find_element_by_xpath("//input[@value='Filter']")
+
+                # find student
+                input_box.clear()
+                input_box.send_keys(f"{student.first} {student.last}")
+                submit.click()
+
+                # click on extensions menu and add acommodations
+                WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//i/span[contains(text(), 'Change user extensions')]/.."))).click()
+                extra_time = get_extra_time(assignment.duration, student.multiplier)
+                add_extensions(driver, extra_time)
+
+                # refresh
+                driver.refresh()
+
+            # a reload before each retry locates the search box and menus again, a student that keeps failing is skipped
+            if not quarantine.run('student', (course_link.link, 'accommodate', assignment.name, student.first, student.last), accommodate_student, reset=open_moderate):
+                open_moderate()
+                continue
+
+            if journal is not None:
+                journal.record(link, 'accommodate', student.first, student.last)
+
+
+def add_accommodations_bulk(session: 'requests.Session', course_link: 'CourseDescriptor', assignment_links: List['str'], assignments: List['Assignment'], students: List['Student'], journal: 'Journal' = None) -> List['Student']:
+    """
+    Adds extra time for every student with one extensions request per assignment, returns the students that could not be found in the course
+    """
+    # resolve students to user ids once for the whole course
+    ids = get_student_ids(session, course_link.link)
+    found = [student for student in students if normalize_name(student.first, student.last) in ids]
+    missing = [student for student in students if normalize_name(student.first, student.last) not in ids]
+
+    # submit all extensions for each assignment at once
+    for assignment, link in zip(assignments, assignment_links):
+        if journal is not None and (link, 'accommodate') in journal:
+            continue
+
+        extensions = [
+            {'user_id': ids[normalize_name(student.first, student.last)], 'extra_time': get_extra_time(assignment.duration, student.multiplier)}
+            for student in found
+        ]
+        if extensions:
+            add_quiz_extensions(session, course_link.link, link, extensions)
+
+        if journal is not None:
+            journal.record(link, 'accommodate')
+
+    return missing
+
+
+@dataclass
+class SyncReport:
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    # (quiz link, user id, extra time) of extensions that aren't in the csv anymore
+    drift: List[Tuple[str, int, int]] = field(default_factory=list)
+    missing: List['Student'] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return f"{self.added} added, {self.changed} changed, {self.unchanged} unchanged, {len(self.drift)} not in csv, {len(self.missing)} not found"
 
-            # find student
-            input_box.clear()
-            input_box.send_keys(f"{student.first} {student.last}")
-            submit.click()
 
-            # click on extensions menu and add acommodations
-            WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//i/span[contains(text(), 'Change user extensions')]/.."))).click()
-            extra_time = get_extra_time(assignment.duration, eval(student.multiplier))
-            add_extensions(driver, extra_time)
+def sync_accommodations(session: 'requests.Session', course_link: 'CourseDescriptor', assignment_links: List['str'], assignments: List['Assignment'], students: List['Student'], journal: 'Journal' = None) -> 'SyncReport':
+    """
+    Compares the extensions already set on each assignment with the csv and only submits the ones that differ
+    """
+    report = SyncReport()
+
+    # resolve students to user ids once for the whole course
+    ids = get_student_ids(session, course_link.link)
+    found = [student for student in students if normalize_name(student.first, student.last) in ids]
+    report.missing = [student for student in students if normalize_name(student.first, student.last) not in ids]
+
+    for assignment, link in zip(assignments, assignment_links):
+        if journal is not None and (link, 'accommodate') in journal:
+            continue
+
+        # what the csv requires against what canvas already has
+        desired = {ids[normalize_name(student.first, student.last)]: get_extra_time(assignment.duration, student.multiplier) for student in found}
+        existing = get_quiz_extensions(session, course_link.link, link)
 
-            # refresh
-            driver.refresh()
+        extensions = [{'user_id': user_id, 'extra_time': extra_time} for user_id, extra_time in desired.items() if existing.get(user_id) != extra_time]
+        report.added += sum(1 for user_id in desired if user_id not in existing)
+        report.changed += sum(1 for user_id in desired if user_id in existing and existing[user_id] != desired[user_id])
+        report.unchanged += len(desired) - len(extensions)
+        report.drift.extend((link, user_id, extra_time) for user_id, extra_time in existing.items() if user_id not in desired and extra_time)
+
+        if extensions:
+            add_quiz_extensions(session, course_link.link, link, extensions)
+
+        if journal is not None:
+            journal.record(link, 'accommodate')
+
+    return report
 
 
 def get_assignment_links(driver: 'Driver', url: str, assignments: List['Assignment']) -> List['str']:
@@ -68,47 +169,97 @@ def get_assignment_links(driver: 'Driver', url: str, assignments: List['Assignme
     # wait for table with quizzes to load
     WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//h2[@aria-controls='assignment-quizzes']")))
 
-    # get link for each assignment
+    # get link for each assignment from a single snapshot of the page's links
+    index = LinkIndex.from_driver(driver)
     links = []
     for assignment in assignments:
-        elem = driver.find_element_by_xpath(f"//a[contains(text(), '{assignment.name}')]")
-        link = elem.get_attribute("href")
+        link = index.find(assignment.name)
+        if link is None:
+            raise NoSuchElementException(f"No link for assignment '{assignment.name}' at {url}")
         links.append(link)
 
     return links
 
 
-def run(driver: 'Driver', url: str, students: Dict[str, List['Student']], assignments: List['Assignment'], _range: 'range', course: 'Course') -> None:
-    # get course links
-    course_links = course.get_links(driver, url, _range)
-
-    for course_link in course_links:
+def accommodate_course(driver: 'Driver', course_link: 'CourseDescriptor', students: Dict[str, List['Student']], assignments: List['Assignment'], mode: str = 'browser', journal: 'Journal' = None) -> None:
+    with driver.trace(course=course_link.name):
         # access exams
         assignment_links = get_assignment_links(driver, f"{course_link.link}/quizzes", assignments)
 
         # add accommodations to each students for the given course
-        add_accommodations(driver, assignment_links, assignments, students[course_link.name])
+        if mode == 'bulk':
+            missing = add_accommodations_bulk(driver.client(), course_link, assignment_links, assignments, students[course_link.name], journal=journal)
+            for student in missing:
+                print(f"Student not found in {course_link.name}: {student.first} {student.last}")
+        elif mode == 'sync':
+            report = sync_accommodations(driver.client(), course_link, assignment_links, assignments, students[course_link.name], journal=journal)
+            print(f"{course_link.name}: {report.summary()}")
+            for link, user_id, extra_time in report.drift:
+                print(f"  user {user_id} has {extra_time} extra minutes on {link} but is not in the csv")
+            for student in report.missing:
+                print(f"  student not found: {student.first} {student.last}")
+        else:
+            add_accommodations(driver, course_link, assignment_links, assignments, students[course_link.name], journal=journal)
+
+
+def run(driver: 'Driver', url: str, students: Dict[str, List['Student']], assignments: List['Assignment'], _range: 'range', course: 'Course', api: bool = False, mode: str = 'browser', journal: 'Journal' = None) -> None:
+    # get course links
+    course_links = course.get_links(driver, url, _range, api=api)
+    course_links = [course_link for course_link in course_links if get_quarantine(driver).selected(course_link.link, 'accommodate')]
+
+    for i, course_link in enumerate(course_links):
+        # start loading the next courses' quizzes while this one is worked on
+        driver.prefetch(f"{following.link}/quizzes" for following in course_links[i + 1:])
+
+        # a course that fails is listed in the failure manifest and the rest carry on
+        run_course(driver, course_link, lambda driver, course_link: accommodate_course(driver, course_link, students, assignments, mode=mode, journal=journal), 'accommodate')
+
+
+def run_parallel(driver: 'Driver', url: str, students: Dict[str, List['Student']], assignments: List['Assignment'], _range: 'range', course: 'Course', workers: int, api: bool = False, mode: str = 'browser', journal: 'Journal' = None) -> 'Report':
+    # get course links
+    course_links = course.get_links(driver, url, _range, api=api)
+
+    course_links = [course_link for course_link in course_links if get_quarantine(driver).selected(course_link.link, 'accommodate')]
+
+    # split the courses across the worker pool
+    task = lambda worker, course_link: accommodate_course(worker, course_link, students, assignments, mode=mode, journal=journal)
+    return run_pool(driver, url, course_links, task, workers, 'accommodate')
 
 
 if __name__ == "__main__":
+    # parse command line arguments
+    parser = ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1, help='number of browsers to run in parallel')
+    parser.add_argument('--chunksize', type=int, help='stream the accommodations csv in chunks of this many rows')
+    parser.add_argument('--mode', choices=['browser', 'bulk', 'sync'], default='browser', help='bulk submits all extensions for a quiz in one request, sync only submits the ones that changed')
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
     # courses main page
     url = input("Enter url for main page: ")
 
     # course type
     course = get_course_type()
+    use_course_index(course, args)
 
     # range
-    _range = get_range()
+    _range = get_range(args.api)
 
     # assignments
     assignments = get_assignments()
 
     # get students
-    students = get_students()
+    students = get_students(args.chunksize)
 
     # initialize driver
-    driver = Driver.initialize()
-    login(driver, url)
+    driver = start_run(args, url)
 
     # begin scraping
-    run(driver, url, students, assignments, _range, course) 
\ No newline at end of file
+    journal = open_journal(args.journal)
+    if args.workers > 1:
+        report = run_parallel(driver, url, students, assignments, _range, course, args.workers, api=args.api, mode=args.mode, journal=journal)
+        print(report.summary())
+    else:
+        run(driver, url, students, assignments, _range, course, api=args.api, mode=args.mode, journal=journal)
+
+    finish_run(driver)
@@ -0,0 +1,14 @@
+from utils.dataset import GradebookDataset
+from argparse import ArgumentParser
+
+
+if __name__ == "__main__":
+    # parse command line arguments
+    parser = ArgumentParser()
+    parser.add_argument('target_dir', help='directory with the exported gradebook csvs')
+    parser.add_argument('dataset_dir', help='directory of the consolidated parquet dataset')
+    args = parser.parse_args()
+
+    # stream every export into the dataset, skipping unchanged courses
+    results = GradebookDataset(args.dataset_dir).add_directory(args.target_dir)
+    print(f"{sum(results.values())} courses updated, {len(results) - sum(results.values())} unchanged")
@@ -0,0 +1,165 @@
+"""
+Keeps a pool of logged in drivers warm and runs jobs submitted over a unix socket
+
+    python daemon.py serve --url https://onramps.instructure.com/accounts/169964? --drivers 2
+    python daemon.py submit job.json
+
+where job.json looks like {"tasks": ["survey"], "url": "...", "course_type": "co", "pages": [1, 3], "survey": {...}}
+"""
+from argparse import ArgumentParser
+from utils.driver import PROFILES
+import socket
+import json
+import sys
+import os
+
+
+SOCKET_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'onramps', 'daemon.sock')
+
+
+def serve(args: 'Namespace') -> None:
+    # the pipeline and pandas are only needed by the daemon itself
+    from queue import Queue
+    from socketserver import ThreadingUnixStreamServer, StreamRequestHandler
+    from utils.driver import Driver
+    from utils.utils import login, get_session_store
+    from utils.session import SessionStore
+    from utils.canvas import split_link
+    from utils.pool import Report
+    from pipeline import TASKS, COURSE_TYPES, get_job_inputs, run_tasks
+
+    store = get_session_store(args)
+
+    def ensure_session(driver: 'Driver', url: str) -> None:
+        # the pool lives for days, so a session canvas has expired in the meantime is renewed before the job starts
+        base, _ = split_link(url)
+        if (store or SessionStore()).valid(base, driver.get_cookies()):
+            return
+
+        login(driver, url, store)
+
+    # log in once and share the session with the rest of the pool
+    drivers = Queue()
+    first = Driver.initialize(args.target_dir, args.profile)
+    login(first, args.url, store)
+    drivers.put(first)
+    for _ in range(args.drivers - 1):
+        driver = Driver.initialize(args.target_dir, args.profile)
+        driver.share_session(first, args.url)
+        drivers.put(driver)
+
+    class JobHandler(StreamRequestHandler):
+        def send(self, **event) -> None:
+            # the client may have gone away, the job still runs to completion
+            try:
+                self.wfile.write((json.dumps(event) + "\n").encode())
+                self.wfile.flush()
+            except OSError:
+                pass
+
+        def handle(self) -> None:
+            try:
+                job = json.loads(self.rfile.readline())
+                unknown = [task for task in job.get('tasks', []) if task not in TASKS]
+                if not job.get('tasks') or unknown:
+                    raise ValueError(f"unknown or missing tasks: {unknown}")
+                inputs = get_job_inputs(job)
+            except Exception as e:
+                self.send(event='error', error=f"invalid job: {type(e).__name__}: {e}")
+                return
+
+            driver = drivers.get()
+            try:
+                ensure_session(driver, job.get('url', args.url))
+                self.send(event='started')
+                course = COURSE_TYPES[job.get('course_type', 'co')]()
+                first_page, last_page = job.get('pages', [1, 1])
+                course_links = course.get_links(driver, job.get('url', args.url), range(first_page, last_page + 1), api=job.get('api', False))
+                self.send(event='discovered', courses=len(course_links))
+
+                # stream every result back as soon as it's known
+                report = Report()
+                for course_link in course_links:
+                    for result in run_tasks(driver, course_link, job['tasks'], inputs):
+                        report.results.append(result)
+                        self.send(event='result', course=course_link.name, link=course_link.link, task=result.task, success=result.success, error=result.error)
+
+                self.send(event='done', succeeded=len(report.succeeded), failed=len(report.failed))
+            except Exception as e:
+                self.send(event='error', error=f"{type(e).__name__}: {e}")
+            finally:
+                # failures were already streamed back, the next job starts with a clean slate
+                driver.quarantine = None
+                drivers.put(driver)
+
+    # replace a socket left behind by a previous daemon
+    os.makedirs(os.path.dirname(args.socket), exist_ok=True)
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+
+    with ThreadingUnixStreamServer(args.socket, JobHandler) as server:
+        print(f"Ready with {args.drivers} drivers on {args.socket}")
+        try:
+            server.serve_forever()
+        finally:
+            while not drivers.empty():
+                drivers.get().quit()
+
+
+def submit(args: 'Namespace') -> int:
+    # read the job from a file or stdin
+    with (open(args.job) if args.job != '-' else sys.stdin) as f:
+        job = json.load(f)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(args.socket)
+        client.sendall((json.dumps(job) + "\n").encode())
+
+        # print progress as it streams back, a daemon that dies mid-job never sends done
+        failed = None
+        for line in client.makefile():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # torn by the daemon going away mid-write
+                break
+            if event['event'] == 'result':
+                status = 'ok' if event['success'] else f"FAILED {event['error']}"
+                print(f"{event['course']} [{event['task']}]: {status}")
+            elif event['event'] == 'discovered':
+                print(f"{event['courses']} courses")
+            elif event['event'] == 'done':
+                print(f"{event['succeeded']} succeeded, {event['failed']} failed")
+                failed = event['failed']
+            elif event['event'] == 'error':
+                print(f"Job failed: {event['error']}")
+                return 1
+
+    if failed is None:
+        print("Connection closed before the job finished")
+        return 1
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # parse command line arguments
+    parser = ArgumentParser()
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='start the daemon')
+    serve_parser.add_argument('--url', required=True, help='courses main page to log in with')
+    serve_parser.add_argument('--drivers', type=int, default=1, help='number of browsers to keep ready')
+    serve_parser.add_argument('--target-dir', default='', help='download directory for exported gradebooks')
+    serve_parser.add_argument('--profile', choices=PROFILES, default='default', help='browser profile, e.g. fast blocks images, fonts and media')
+    serve_parser.add_argument('--remember', action='store_true', help='save the login to an encrypted file and reuse it while it is valid')
+
+    submit_parser = commands.add_parser('submit', help='submit a job and stream its progress')
+    submit_parser.add_argument('job', help="json job file, or - for stdin")
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args)
+    else:
+        sys.exit(submit(args))
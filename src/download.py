@@ -1,9 +1,14 @@
-from typing import List
-from utils.utils import login, download_manager, get_course_type, get_range
+from typing import List, Dict
+from utils.utils import add_run_arguments, start_run, finish_run, get_quarantine, use_course_index, download_manager, get_course_type, get_range
 from utils.driver import Driver
+from utils.journal import open_journal
+from utils.pool import run_course
+from utils.export import GradebookExporter
+from utils.downloads import download_directory
+from utils.dataset import GradebookDataset
+from utils.trace import WebDriverWait
 from argparse import ArgumentParser
 
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 
@@ -23,13 +28,62 @@ def download(driver: Driver, url: str) -> None:
     WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//span[text()='Export']"))).click()
 
 
-def run(driver: 'Driver', url: str, _range: 'range', course: 'Course'):
+def run(driver: 'Driver', url: str, _range: 'range', course: 'Course', api: bool = False, journal: 'Journal' = None) -> Dict[str, str]:
+    """
+    Downloads the gradebook of every course, returns the path of each one downloaded by this run by course name
+    """
     # initialize
-    course_links = course.get_links(driver, url, _range)
-    
+    course_links = course.get_links(driver, url, _range, api=api)
+
+    # drop finished and skipped courses first so only courses that will be worked on are preloaded
+    course_links = [course_link for course_link in course_links if (journal is None or (course_link.link, 'download') not in journal) and get_quarantine(driver).selected(course_link.link, 'download')]
+
+    paths = {}
+
+    def export(driver: 'Driver', course_link: 'CourseDescriptor') -> None:
+        paths[course_link.name] = download(driver, f"{course_link.link}/gradebook", match=course_link.name)
+
     # parse
+    for i, course_link in enumerate(course_links):
+        # start loading the next gradebooks while this one exports
+        driver.prefetch(f"{following.link}/gradebook" for following in course_links[i + 1:])
+
+        # a gradebook that fails to export is listed in the failure manifest and the rest carry on
+        with driver.trace(course=course_link.name):
+            result = run_course(driver, course_link, export, 'download')
+
+        if result.success and journal is not None:
+            journal.record(course_link.link, 'download')
+
+    return paths
+
+
+def run_concurrent(driver: 'Driver', url: str, _range: 'range', course: 'Course', target_dir: str, concurrency: int, api: bool = False, journal: 'Journal' = None) -> Dict[str, str]:
+    """
+    Exports the gradebook of every course through the api, returns the path of each one exported by this run by course name
+    """
+    # initialize
+    course_links = course.get_links(driver, url, _range, api=api)
+    if journal is not None:
+        course_links = [course_link for course_link in course_links if (course_link.link, 'download') not in journal]
+    course_links = [course_link for course_link in course_links if get_quarantine(driver).selected(course_link.link, 'download')]
+
+    # export every gradebook at once through the api
+    exporter = GradebookExporter(driver.client(), target_dir, concurrency)
+    results = exporter.run(course_links)
+
+    paths = {}
     for course_link in course_links:
-        download(driver, f"{course_link.link}/gradebook")
+        result = results[course_link.link]
+        if isinstance(result, Exception):
+            get_quarantine(driver).record('course', (course_link.link, 'download'), result)
+            continue
+
+        paths[course_link.name] = result
+        if journal is not None:
+            journal.record(course_link.link, 'download')
+
+    return paths
 
 
 if __name__ == "__main__":
@@ -39,17 +93,32 @@ if __name__ == "__main__":
     # parse command line arguments
     parser = ArgumentParser()
     parser.add_argument('target_dir', nargs='?')
+    parser.add_argument('--concurrent', type=int, default=0, help='export this many gradebooks at once through the api')
+    parser.add_argument('--consolidate', help='parquet dataset directory to merge the gradebooks downloaded by this run into')
+    add_run_arguments(parser)
     args = parser.parse_args()
 
     # determine course type
     course = get_course_type()
+    use_course_index(course, args)
 
     # get range
-    _range = get_range()
+    _range = get_range(args.api)
 
     # initialize driver with target download directory
-    driver = Driver.initialize(args.target_dir)
-    login(driver, url)
+    driver = start_run(args, url, target_dir=args.target_dir)
 
     # begin scraping
-    run(driver, url, _range, course)
\ No newline at end of file
+    if args.concurrent:
+        # the api exports go where the browser would have saved them
+        paths = run_concurrent(driver, url, _range, course, download_directory(args.target_dir), args.concurrent, api=args.api, journal=open_journal(args.journal))
+    else:
+        paths = run(driver, url, _range, course, api=args.api, journal=open_journal(args.journal))
+
+    # merge only this run's exports into the consolidated dataset, the download directory may hold any other csv
+    if args.consolidate:
+        dataset = GradebookDataset(args.consolidate)
+        for name, path in paths.items():
+            dataset.add(path, name)
+
+    finish_run(driver)
@@ -0,0 +1,272 @@
+from typing import List, Dict, Callable, Tuple
+from utils.utils import Assignment, load_students, add_run_arguments, start_run, finish_run, get_quarantine, use_course_index, get_course_index, get_students, get_course_type, get_survey_inputs, get_assignments, get_range
+from utils.driver import Driver
+from utils.journal import open_journal
+from utils.pool import Report, failure, run_course, run_queue, start_workers
+from utils.canvas import split_link
+from utils.courses.course_utils import CourseDescriptor
+from utils.courses.courses import CollegeCourse, HighSchoolCourse
+from argparse import ArgumentParser
+import json
+import sys
+
+import accommodate
+import download
+import survey
+import regrade
+
+
+def survey_task(driver: 'Driver', course_link: 'CourseDescriptor', inputs: Dict) -> None:
+    survey.survey_course(driver, course_link, inputs['survey'])
+
+
+def accommodate_task(driver: 'Driver', course_link: 'CourseDescriptor', inputs: Dict) -> None:
+    accommodate.accommodate_course(driver, course_link, inputs['students'], inputs['assignments'], mode=inputs['mode'])
+
+
+def download_task(driver: 'Driver', course_link: 'CourseDescriptor', inputs: Dict) -> None:
+    download.download(driver, f"{course_link.link}/gradebook", match=course_link.name)
+
+
+def regrade_task(driver: 'Driver', course_link: 'CourseDescriptor', inputs: Dict) -> None:
+    regrade.regrade_speedgrader(driver, course_link)
+
+
+TASKS: Dict[str, Callable[['Driver', 'CourseDescriptor', Dict], None]] = {
+    'survey': survey_task,
+    'accommodate': accommodate_task,
+    'download': download_task,
+    'regrade': regrade_task,
+}
+
+
+# the page each task loads first, so the next course can be preloaded for the first task
+TASK_PAGES = {
+    'survey': 'assignments',
+    'accommodate': 'quizzes',
+    'download': 'gradebook',
+    'regrade': 'assignments',
+}
+
+
+def get_inputs(tasks: List[str], args: 'Namespace') -> Dict:
+    # ask for everything up front so the run itself is unattended
+    inputs = {'mode': getattr(args, 'mode', 'browser')}
+    if 'survey' in tasks:
+        inputs['survey'] = get_survey_inputs()
+    if 'accommodate' in tasks:
+        inputs['assignments'] = get_assignments()
+        inputs['students'] = get_students()
+
+    return inputs
+
+
+COURSE_TYPES = {
+    'hs': HighSchoolCourse,
+    'co': CollegeCourse,
+}
+
+
+def get_job_inputs(job: Dict) -> Dict:
+    """
+    Non-interactive counterpart of get_inputs for jobs described in json, e.g.
+    {"survey": {"url": ..., "intro": ..., "finish": ...}, "assignments": [{"name": ..., "duration": 30}], "students": "accommodations.csv"}
+    """
+    inputs = {'mode': job.get('mode', 'browser')}
+    if 'survey' in job:
+        inputs['survey'] = job['survey']
+    if 'assignments' in job:
+        inputs['assignments'] = [Assignment(**assignment) for assignment in job['assignments']]
+    if 'students' in job:
+        inputs['students'] = load_students(job['students']).by_course
+
+    return inputs
+
+
+def run_tasks(driver: 'Driver', course_link: 'CourseDescriptor', tasks: List[str], inputs: Dict, journal: 'Journal' = None, retry_all: bool = False) -> List['CourseResult']:
+    """
+    Runs every task for a single course while its session and pages are warm,
+    retry_all runs tasks the failure manifest doesn't list, e.g. for courses of an account that couldn't be discovered
+    """
+    quarantine = get_quarantine(driver)
+    results = []
+    with driver.trace(course=course_link.name):
+        for name in tasks:
+            if journal is not None and (course_link.link, name) in journal:
+                continue
+            # only the tasks that failed for the course are rerun
+            if not retry_all and not quarantine.selected(course_link.link, name):
+                continue
+
+            result = run_course(driver, course_link, lambda worker, link: TASKS[name](worker, link, inputs), name)
+            results.append(result)
+
+            if result.success and journal is not None:
+                journal.record(course_link.link, name)
+
+    return results
+
+
+def run(driver: 'Driver', url: str, _range: 'range', course: 'Course', tasks: List[str], inputs: Dict, api: bool = False, journal: 'Journal' = None) -> 'Report':
+    # discover courses once for every task
+    course_links = course.get_links(driver, url, _range, api=api)
+
+    # drop finished and skipped courses first so only courses that will be worked on are preloaded
+    course_links = [course_link for course_link in course_links if any(get_quarantine(driver).selected(course_link.link, name) for name in tasks)]
+    if journal is not None:
+        course_links = [course_link for course_link in course_links if not all((course_link.link, name) in journal for name in tasks)]
+
+    report = Report()
+    for i, course_link in enumerate(course_links):
+        driver.prefetch(f"{following.link}/{TASK_PAGES[tasks[0]]}" for following in course_links[i + 1:])
+        report.results.extend(run_tasks(driver, course_link, tasks, inputs, journal))
+
+    return report
+
+
+def load_manifest(path: str) -> Dict:
+    """
+    Reads a job manifest and checks every job before any browser starts, e.g.
+    {"concurrency": 3, "results": "results.json", "jobs": [{"url": ".../accounts/169964?", "course_type": "co", "pages": [1, 4], "tasks": ["download"]}]}
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+
+    for job in manifest['jobs']:
+        tasks = job.get('tasks', [])
+        if 'url' not in job or not tasks or any(task not in TASKS for task in tasks) or job.get('course_type', 'co') not in COURSE_TYPES:
+            raise ValueError(f"invalid job in {path}: {job}")
+        if 'survey' in tasks and 'survey' not in job:
+            raise ValueError(f"survey job for {job['url']} is missing its survey inputs")
+        if 'accommodate' in tasks and ('students' not in job or 'assignments' not in job):
+            raise ValueError(f"accommodate job for {job['url']} is missing its students or assignments")
+
+    return manifest
+
+
+def account_urls(manifest: Dict) -> List[str]:
+    # one url per canvas instance, every account on it shares the login
+    urls = {}
+    for job in manifest['jobs']:
+        base, _ = split_link(job['url'])
+        urls.setdefault(base, job['url'])
+
+    return list(urls.values())
+
+
+def run_manifest(driver: 'Driver', manifest: Dict, workers: int, index: 'CourseIndex' = None, journal: 'Journal' = None) -> Dict[str, 'Report']:
+    """
+    Fans the jobs of every account out across a pool of drivers, returns a report per job
+    """
+    jobs = manifest['jobs']
+    labels = [job.get('name', f"{job['url']} ({job.get('course_type', 'co')})") for job in jobs]
+    inputs = [get_job_inputs(job) for job in jobs]
+    drivers = [driver] + start_workers(driver, account_urls(manifest), workers - 1)
+
+    def discover(worker: 'Driver', i: int) -> Tuple['CourseResult', List['CourseDescriptor']]:
+        job = jobs[i]
+        links = []
+
+        def task(worker: 'Driver', _) -> None:
+            course = COURSE_TYPES[job.get('course_type', 'co')]()
+            course.index = index
+            first_page, last_page = job.get('pages', [1, 1])
+            links.extend(course.get_links(worker, job['url'], range(first_page, last_page + 1), api=job.get('api', False)))
+
+        # an account that can't be discovered is reported like a failed course
+        return run_course(worker, CourseDescriptor(labels[i], job['url']), task, 'discover'), links
+
+    def run_job_course(worker: 'Driver', item: Tuple[int, 'CourseDescriptor']) -> List['CourseResult']:
+        i, course_link = item
+        return run_tasks(worker, course_link, jobs[i]['tasks'], inputs[i], journal, retry_all=quarantine.retrying(jobs[i]['url'], 'discover'))
+
+    # discover every account's courses first so all drivers can share the course work
+    reports = {label: Report() for label in labels}
+    quarantine = get_quarantine(driver)
+    items = []
+    discovered = run_queue(drivers, list(range(len(jobs))), discover, lambda i, e: (failure(CourseDescriptor(labels[i], jobs[i]['url']), e, 'discover'), []))
+    for i, (result, links) in enumerate(discovered):
+        if not result.success:
+            reports[labels[i]].results.append(result)
+        # an account that failed to be discovered last time has all of its courses retried
+        items.extend((i, course_link) for course_link in links if quarantine.retrying(jobs[i]['url'], 'discover') or any(quarantine.selected(course_link.link, name) for name in jobs[i]['tasks']))
+
+    failed = lambda item, e: [failure(item[1], e, name) for name in jobs[item[0]]['tasks']]
+    for (i, _), results in zip(items, run_queue(drivers, items, run_job_course, failed)):
+        reports[labels[i]].results.extend(results)
+
+    # shut down the extra browsers
+    for worker in drivers[1:]:
+        worker.quit()
+
+    return reports
+
+
+def write_results(path: str, reports: Dict[str, 'Report']) -> None:
+    rows = [
+        {'job': label, 'course': result.course.name, 'link': result.course.link, 'task': result.task, 'success': result.success, 'error': result.error}
+        for label, report in reports.items()
+        for result in report.results
+    ]
+    with open(path, 'w') as f:
+        json.dump(rows, f, indent=2)
+
+
+def main_manifest(args: 'Namespace') -> None:
+    manifest = load_manifest(args.manifest)
+
+    # initialize driver and log in to every canvas instance once
+    driver = start_run(args, *account_urls(manifest), target_dir=args.target_dir)
+
+    # begin scraping
+    workers = args.workers or manifest.get('concurrency', 1)
+    reports = run_manifest(driver, manifest, workers, index=get_course_index(args), journal=open_journal(args.journal))
+    for label, report in reports.items():
+        print(label)
+        print(report.summary())
+    total = Report(results=[result for report in reports.values() for result in report.results])
+    print(f"Total: {len(total.succeeded)} succeeded, {len(total.failed)} failed")
+
+    if manifest.get('results'):
+        write_results(manifest['results'], reports)
+    finish_run(driver)
+
+
+if __name__ == "__main__":
+    # parse command line arguments
+    parser = ArgumentParser()
+    parser.add_argument('tasks', nargs='*', help=f"tasks to run for every course, in order, any of {', '.join(TASKS)}")
+    parser.add_argument('--manifest', help='json manifest of accounts, course types, pages and tasks to run without any prompts')
+    parser.add_argument('--workers', type=int, default=0, help="number of browsers shared by every job of the manifest, defaults to the manifest's concurrency")
+    parser.add_argument('--target-dir', default='', help='download directory for exported gradebooks')
+    parser.add_argument('--mode', choices=['browser', 'bulk', 'sync'], default='browser', help='how accommodations are submitted')
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    if args.manifest:
+        main_manifest(args)
+        sys.exit()
+    if not args.tasks or any(task not in TASKS for task in args.tasks):
+        parser.error(f"choose tasks from {', '.join(TASKS)}")
+
+    # courses main page
+    url = input("Enter url for main page: ")
+
+    # course type
+    course = get_course_type()
+    use_course_index(course, args)
+
+    # range
+    _range = get_range(args.api)
+
+    # task inputs
+    inputs = get_inputs(args.tasks, args)
+
+    # initialize driver
+    driver = start_run(args, url, target_dir=args.target_dir)
+
+    # begin scraping
+    report = run(driver, url, _range, course, args.tasks, inputs, api=args.api, journal=open_journal(args.journal))
+    print(report.summary())
+
+    finish_run(driver)
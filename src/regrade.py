@@ -2,17 +2,33 @@ from typing import List, Tuple
 from time import sleep
 
 from utils.driver import Driver
-from utils.utils import login
+from utils.journal import open_journal
+from utils.pool import run_course
+from utils.canvas import find_quiz, get_first_question_id, get_quiz_submissions, get_question_points, set_fudge_points, get_submitted_student_ids, split_link
+from utils.utils import add_run_arguments, start_run, finish_run, get_quarantine, use_course_index
 from utils.courses.courses import CollegeCourse
+from utils.trace import WebDriverWait
+from utils.wait import waits
 from argparse import ArgumentParser
 
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
 
 
-def grade_student(driver: 'Driver') -> None:
+# the assignment being regraded, change this in order to regrade other assignments
+ASSIGNMENT = '7 & 8'
+
+
+def fudge_points(total: float, current_fudge: float) -> float:
+    """
+    Helper function that computes the fudge points curving the raw score by 10/9
+    """
+    return round(round((total - current_fudge) * 10/9, 2) - (total - current_fudge), 2)
+
+
+def grade_student(driver: 'Driver', advance: bool = True) -> None:
     """
     Helper function to add fudge points to the student's grade for curving purposes
     """
@@ -20,7 +36,7 @@ def grade_student(driver: 'Driver') -> None:
     WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.XPATH, "//div/div/span[contains(text(), 'Question 1') or contains(text(), 'Pregunta 1')]")))
 
     question = driver.find_element_by_xpath("//div/div/span[contains(text(), 'Question 1') or contains(text(), 'Pregunta 1')]/../..")
-    score = int(question.find_element_by_xpath("//div[@class='header']/span/div[@class='user_points']/input[@class='question_input']").get_attribute('value'))
+    score = float(question.find_element_by_xpath("//div[@class='header']/span/div[@class='user_points']/input[@class='question_input']").get_attribute('value'))
 
     if score == 0:
         total = float(driver.find_element_by_xpath("//span[@class='score_value']").text)
@@ -30,7 +46,7 @@ def grade_student(driver: 'Driver') -> None:
 
         fudge.clear()
 
-        points = round(round((total - current_fudge) * 10/9, 2) - (total - current_fudge), 2)
+        points = fudge_points(total, current_fudge)
         fudge.send_keys(str(points))
 
     # submit
@@ -38,7 +54,8 @@ def grade_student(driver: 'Driver') -> None:
 
     # next student
     driver.switch_to.default_content()
-    driver.find_element_by_xpath("//i[@class='icon-arrow-right next']").click()
+    if advance:
+        driver.find_element_by_xpath("//i[@class='icon-arrow-right next']").click()
 
 
 def show_all_sections(driver) -> None:
@@ -71,17 +88,17 @@ def access_assignment(driver: 'Driver', url: str) -> int:
     driver.get(url)
 
     try:
-        # the XPath in this line can change in order to regrade other assignments
-        WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), '7 & 8')]"))).click()
-    except:
+        waits.until(driver, 'regrade_assignment', EC.element_to_be_clickable((By.XPATH, f"//a[contains(text(), '{ASSIGNMENT}')]")), 5, probe=True).click()
+    except TimeoutException:
         # not a valid high school course
         return 0
 
     # open survey tab
+    handles = driver.window_handles
     WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//a/i/span[contains(text(), 'SpeedGrader')]/../.."))).click()
 
     # switch to new tab
-    driver.switch_to.window(driver.window_handles[1])
+    driver.switch_to_new_window(handles)
 
      # use actions to click on dropdown menu and show all sections
     show_all_sections(driver)
@@ -95,24 +112,139 @@ def access_assignment(driver: 'Driver', url: str) -> int:
     return num_students
 
 
-def run(driver: 'Driver', num_students: int) -> None:
+def run(driver: 'Driver', num_students: int, journal: 'Journal' = None, key: str = "") -> None:
+    quarantine = get_quarantine(driver)
+
+    def grade() -> None:
+        # wait for either the submission or the no submission banner, whichever shows up first
+        state, _ = waits.until_any(driver, {
+            'missing': EC.presence_of_element_located((By.XPATH, "//div[@id='this_student_does_not_have_a_submission' and @style='display: block;']")),
+            'submission': EC.frame_to_be_available_and_switch_to_it((By.XPATH, "//iframe[@id='speedgrader_iframe']")),
+        }, 5, key='speedgrader_student')
+
+        if state == 'missing':
+            WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.XPATH, "//i[@class='icon-arrow-right next']"))).click()
+            return
+
+        grade_student(driver)
+
     # parse
-    for _ in range(num_students):
+    for i in range(num_students):
+        # clicking next never goes through get, so long courses are recycled between students instead
+        if i:
+            driver.checkpoint()
+
         WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.XPATH, "//i[@class='icon-arrow-right next']")))
-        try:
-            WebDriverWait(driver, 1).until(EC.presence_of_element_located((By.XPATH, "//div[@id='this_student_does_not_have_a_submission' and @style='display: block;']")))
-            WebDriverWait(driver, 8).until(EC.element_to_be_clickable((By.XPATH, "//i[@class='icon-arrow-right next']"))).click()
+
+        # skip students graded by an earlier run
+        if (journal is not None and (key, 'regrade', i) in journal) or not quarantine.selected(key, 'regrade', i):
+            driver.find_element_by_xpath("//i[@class='icon-arrow-right next']").click()
             continue
-        except:
-            pass
-        try:
-            WebDriverWait(driver, 5).until(EC.frame_to_be_available_and_switch_to_it((By.XPATH, "//iframe[@id='speedgrader_iframe']")))
-            grade_student(driver)
-        except:
+
+        # retries start from the top level page so the iframe is located again, a student that keeps failing is skipped
+        if not quarantine.run('submission', (key, 'regrade', i), grade, reset=driver.switch_to.default_content):
             driver.switch_to.default_content()
             driver.find_element_by_xpath("//i[@class='icon-arrow-right next']").click()
             continue
 
+        if journal is not None:
+            journal.record(key, 'regrade', i)
+
+
+def regrade_speedgrader(driver: 'Driver', course_link: 'CourseDescriptor', journal: 'Journal' = None) -> None:
+    """
+    Grades every student of the course by stepping through SpeedGrader, then closes its tab
+    """
+    num_students = access_assignment(driver, f"{course_link.link}/assignments")
+    if not num_students:
+        return
+
+    run(driver, num_students, journal=journal, key=course_link.link)
+    driver.close()
+    driver.switch_to.window(driver.main_window)
+
+
+def run_direct(driver: 'Driver', course_link: str, name: str = ASSIGNMENT, journal: 'Journal' = None) -> int:
+    """
+    Opens SpeedGrader directly for every student with a submission, in user id order, returns the number of students graded
+    """
+    quiz = find_quiz(driver.client(), course_link, name)
+    if quiz is None:
+        # not a valid course
+        return 0
+
+    base, course_id = split_link(course_link)
+    quarantine = get_quarantine(driver)
+    graded = 0
+    for user_id in get_submitted_student_ids(driver.client(), course_link, quiz['assignment_id']):
+        # skip students graded by an earlier run
+        if journal is not None and (course_link, 'regrade', user_id) in journal:
+            continue
+        if not quarantine.selected(course_link, 'regrade', user_id):
+            continue
+
+        def grade() -> None:
+            driver.get(f"{base}/courses/{course_id}/gradebook/speed_grader?assignment_id={quiz['assignment_id']}&student_id={user_id}")
+            WebDriverWait(driver, 5).until(EC.frame_to_be_available_and_switch_to_it((By.XPATH, "//iframe[@id='speedgrader_iframe']")))
+            grade_student(driver, advance=False)
+
+        if not quarantine.run('submission', (course_link, 'regrade', user_id), grade, reset=driver.switch_to.default_content):
+            driver.switch_to.default_content()
+            continue
+
+        graded += 1
+        if journal is not None:
+            journal.record(course_link, 'regrade', user_id)
+
+    return graded
+
+
+def regrade_course(session: 'requests.Session', course_link: str, name: str = ASSIGNMENT, journal: 'Journal' = None) -> int:
+    """
+    Regrades every submission of the assignment in one pass over the submissions api, returns the number of submissions changed
+    """
+    quiz = find_quiz(session, course_link, name)
+    if quiz is None:
+        # not a valid course
+        return 0
+
+    # pull every submission and its question 1 score at once
+    question_id = get_first_question_id(session, course_link, quiz)
+    if question_id is None:
+        # nothing to curve on a quiz without questions
+        return 0
+    question_points = get_question_points(session, course_link, quiz, question_id)
+    quiz_submissions = get_quiz_submissions(session, course_link, quiz)
+
+    changed = 0
+    for quiz_submission in quiz_submissions:
+        if quiz_submission['workflow_state'] not in {'complete', 'pending_review'}:
+            continue
+
+        # skip students graded by an earlier run
+        if journal is not None and (course_link, 'regrade', quiz_submission['user_id']) in journal:
+            continue
+
+        # same rule as grade_student, only curve students who got no credit at all on question 1
+        score = question_points.get((quiz_submission['user_id'], quiz_submission['attempt']))
+        if score is None or float(score) != 0:
+            continue
+
+        total = float(quiz_submission['score'] or 0)
+        current_fudge = float(quiz_submission['fudge_points'] or 0)
+        points = fudge_points(total, current_fudge)
+
+        # only write back submissions that actually change
+        if points != current_fudge:
+            set_fudge_points(session, course_link, quiz, quiz_submission, points)
+            changed += 1
+
+        if journal is not None:
+            journal.record(course_link, 'regrade', quiz_submission['user_id'])
+
+    return changed
+
+
 def test():
     url = "https://onramps.instructure.com/courses/3018432/gradebook/speed_grader?assignment_id=28393321&student_id=11553403"
 
@@ -126,20 +258,57 @@ def test():
 def main():
     url = "https://onramps.instructure.com/accounts/172690?" # college algebra
 
-    driver = Driver.initialize()
-    login(driver, url)
+    # parse command line arguments
+    parser = ArgumentParser()
+    parser.add_argument('--direct', action='store_true', help='open SpeedGrader directly for students with submissions only')
+    parser.add_argument('--batch', action='store_true', help='regrade through the submissions api instead of SpeedGrader')
+    parser.add_argument('--wait-stats', action='store_true', help='print the observed wait latencies at the end of the run')
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    driver = start_run(args, url)
 
     course = CollegeCourse()
+    use_course_index(course, args)
 
     # bad code, the range shouldn't be hard coded, can be adapted for any subject
-    links = course.get_links(driver, url, range(1, 7))
+    links = course.get_links(driver, url, range(1, 7), api=args.api)
+
+    journal = open_journal(args.journal)
+
+    # drop skipped courses first so only courses that will be worked on are preloaded
+    links = [link for link in links if get_quarantine(driver).selected(link.link, 'regrade')]
 
     # run
-    for link in links:
-        num_students = access_assignment(driver, f"{link.link}/assignments")
-        run(driver, num_students)
-        driver.close()
-        driver.switch_to.window(driver.window_handles[0])
+    if args.batch:
+        # regrade every course through the api, a course that fails is listed in the failure manifest and the rest carry on
+        def regrade_batch(driver: 'Driver', link: 'CourseDescriptor') -> None:
+            changed = regrade_course(driver.client(), link.link, journal=journal)
+            print(f"{link.name}: {changed} submissions regraded")
+
+        for link in links:
+            run_course(driver, link, regrade_batch, 'regrade')
+    elif args.direct:
+        # visit only the students with submissions
+        def regrade_direct(driver: 'Driver', link: 'CourseDescriptor') -> None:
+            graded = run_direct(driver, link.link, journal=journal)
+            print(f"{link.name}: {graded} students graded")
+
+        for link in links:
+            with driver.trace(course=link.name):
+                run_course(driver, link, regrade_direct, 'regrade')
+    else:
+        for i, link in enumerate(links):
+            # start loading the next courses while this one is graded
+            driver.prefetch(f"{following.link}/assignments" for following in links[i + 1:])
+
+            # a course that fails is listed in the failure manifest and the rest carry on
+            with driver.trace(course=link.name):
+                run_course(driver, link, lambda driver, link: regrade_speedgrader(driver, link, journal), 'regrade')
+
+    finish_run(driver)
+    if args.wait_stats:
+        waits.report()
         
 
 if __name__ == "__main__":
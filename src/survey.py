@@ -1,11 +1,15 @@
 from typing import List, Dict
-from utils.utils import login, get_course_type, get_survey_inputs, get_range
+from utils.utils import add_run_arguments, start_run, finish_run, get_quarantine, use_course_index, get_course_type, get_survey_inputs, get_range
 from utils.driver import Driver
+from utils.journal import open_journal
+from utils.pool import run_course, reset_tabs
+from utils.trace import WebDriverWait
+from utils.wait import waits
 from argparse import ArgumentParser
 
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
 
 
 def access_survey(driver: 'Driver', url: str) -> bool:
@@ -17,16 +21,17 @@ def access_survey(driver: 'Driver', url: str) -> bool:
 
     # click on survey link
     try:
-        WebDriverWait(driver, 7).until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Student Perspective Survey Fall 1')]"))).click()
-    except:
+        waits.until(driver, 'survey_link', EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Student Perspective Survey Fall 1')]")), 7, probe=True).click()
+    except TimeoutException:
         # not a valid high school course
         return False
 
     # open survey tab
+    handles = driver.window_handles
     WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Load Student Perspective Survey')]"))).click()
 
     # switch to new tab
-    driver.switch_to.window(driver.window_handles[1])
+    driver.switch_to_new_window(handles)
 
     return True
 
@@ -70,21 +75,43 @@ def fill_survey(driver: 'Driver', inputs: Dict[str, str]) -> None:
 
     # switch to original tab
     driver.close()
-    driver.switch_to.window(driver.window_handles[0])
+    driver.switch_to.window(driver.main_window)
 
 
-def run(driver: 'Driver', url: str, inputs: Dict[str, str], _range: 'range', course: 'Course') -> None:
+def survey_course(driver: 'Driver', course_link: 'CourseDescriptor', inputs: Dict[str, str]) -> None:
+    # a page that loads too slowly or a stale element is retried from the assignments page
+    policy = get_quarantine(driver).policy
+    valid_course = policy.call(lambda: access_survey(driver, f"{course_link.link}/assignments"), reset=lambda: reset_tabs(driver))
+    if valid_course:
+        policy.call(lambda: fill_survey(driver, inputs), reset=driver.refresh)
+
+
+def run(driver: 'Driver', url: str, inputs: Dict[str, str], _range: 'range', course: 'Course', api: bool = False, journal: 'Journal' = None) -> None:
     # get links
-    course_links = course.get_links(driver, url, _range)
+    course_links = course.get_links(driver, url, _range, api=api)
+
+    # drop finished and skipped courses first so only courses that will be worked on are preloaded
+    course_links = [link for link in course_links if (journal is None or (link.link, 'survey') not in journal) and get_quarantine(driver).selected(link.link, 'survey')]
 
     # fill out forms
-    for link in course_links:
-        valid_course = access_survey(driver, f"{link.link}/assignments")
-        if valid_course:
-            fill_survey(driver, inputs)
+    for i, link in enumerate(course_links):
+        # start loading the next courses while this one is worked on
+        driver.prefetch(f"{following.link}/assignments" for following in course_links[i + 1:])
+
+        with driver.trace(course=link.name):
+            # a course that fails is listed in the failure manifest and the rest carry on
+            result = run_course(driver, link, lambda driver, link: survey_course(driver, link, inputs), 'survey')
+
+        if result.success and journal is not None:
+            journal.record(link.link, 'survey')
 
 
 if __name__ == "__main__":
+    # parse command line arguments
+    parser = ArgumentParser()
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
     # courses main page
     url = 'https://onramps.instructure.com/accounts/169964?'
 
@@ -93,13 +120,15 @@ if __name__ == "__main__":
 
     # determine course type
     course = get_course_type()
+    use_course_index(course, args)
 
     # range
-    _range = get_range()
+    _range = get_range(args.api)
 
     # initialize driver
-    driver = Driver.initialize()
-    login(driver, url)
+    driver = start_run(args, url)
 
     # begin scraping
-    run(driver, url, inputs, _range, course)
+    run(driver, url, inputs, _range, course, api=args.api, journal=open_journal(args.journal))
+
+    finish_run(driver)
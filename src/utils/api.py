@@ -0,0 +1,190 @@
+from typing import List, Dict, Iterator
+from urllib.parse import unquote
+from threading import Lock
+from collections import deque
+from time import sleep, monotonic, perf_counter
+from requests.adapters import HTTPAdapter
+import requests
+import random
+
+
+class Throttle:
+    """
+    Token bucket mirroring canvas' rate limit bucket, refilled from the X-Rate-Limit-Remaining header of every response
+    """
+    def __init__(self, low_water: float = 200.0, leak_rate: float = 10.0):
+        # canvas refills the bucket at roughly leak_rate units per second
+        self.low_water = low_water
+        self.leak_rate = leak_rate
+        self.remaining = None
+        self.updated = monotonic()
+        self.cost = 0.0
+        self.lock = Lock()
+
+    def delay(self) -> float:
+        with self.lock:
+            if self.remaining is None:
+                return 0.0
+
+            # keep enough headroom for the next request's expected cost
+            estimated = self.remaining + (monotonic() - self.updated) * self.leak_rate
+            deficit = self.low_water + self.cost - estimated
+            return max(0.0, deficit / self.leak_rate)
+
+    def update(self, headers: Dict) -> None:
+        with self.lock:
+            if 'X-Rate-Limit-Remaining' in headers:
+                self.remaining = float(headers['X-Rate-Limit-Remaining'])
+                self.updated = monotonic()
+            if 'X-Request-Cost' in headers:
+                self.cost = 0.8 * self.cost + 0.2 * float(headers['X-Request-Cost'])
+
+
+class ClientMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.throttled = 0.0
+        self.cost = 0.0
+        # a rolling window, a client lives as long as its driver
+        self.latencies: deque = deque(maxlen=1000)
+        self.lock = Lock()
+
+    def summary(self) -> Dict[str, float]:
+        with self.lock:
+            latencies = sorted(self.latencies)
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'errors': self.errors,
+                'throttled_seconds': round(self.throttled, 3),
+                'cost': round(self.cost, 3),
+                'p50': round(latencies[len(latencies) // 2], 3) if latencies else None,
+                'p95': round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None,
+            }
+
+
+# every client shares one throttle, canvas rate limits per user rather than per connection
+THROTTLE = Throttle()
+
+
+# a 5xx or a dropped connection may come after canvas already acted on the request, e.g. started a gradebook export,
+# so only these are repeated then, anything else is only retried when canvas throttled it before doing any work
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+def throttled(response: 'requests.Response') -> bool:
+    # canvas signals throttling with a 403 and a "Rate Limit Exceeded" body
+    if response.status_code == 403:
+        return 'Rate Limit Exceeded' in response.text
+    return response.status_code == 429
+
+
+def retryable(response: 'requests.Response', method: str = 'GET') -> bool:
+    return throttled(response) or (response.status_code >= 500 and method.upper() in IDEMPOTENT_METHODS)
+
+
+class CanvasClient(requests.Session):
+    """
+    Pooled keep-alive session that throttles on canvas' rate limit headers, retries throttled responses,
+    and retries 5xx responses and dropped connections of idempotent requests
+    """
+    def __init__(self, pool_size: int = 16, retries: int = 5, backoff: float = 0.5, max_backoff: float = 30.0, throttle: 'Throttle' = THROTTLE):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.throttle = throttle
+        self.metrics = ClientMetrics()
+
+    def request(self, method, url, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            delay = self.throttle.delay()
+            if delay:
+                sleep(delay)
+
+            start = perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.ConnectionError:
+                with self.metrics.lock:
+                    self.metrics.errors += 1
+                if attempt == self.retries or method.upper() not in IDEMPOTENT_METHODS:
+                    raise
+                self._backoff(attempt)
+                continue
+
+            self.throttle.update(response.headers)
+            with self.metrics.lock:
+                self.metrics.requests += 1
+                self.metrics.throttled += delay
+                self.metrics.latencies.append(perf_counter() - start)
+                self.metrics.cost += float(response.headers.get('X-Request-Cost', 0))
+
+            if attempt == self.retries or not retryable(response, method):
+                return response
+
+            response.close()
+            self._backoff(attempt)
+
+        return response
+
+    def _backoff(self, attempt: int) -> None:
+        # exponential backoff with full jitter so parallel workers don't retry in lockstep
+        with self.metrics.lock:
+            self.metrics.retries += 1
+        sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+
+def session_from_driver(driver: 'Driver') -> 'CanvasClient':
+    """
+    Builds a client that is authenticated with the cookies of the logged in driver
+    """
+    return session_from_cookies(driver.get_cookies())
+
+
+def session_from_cookies(cookies: List[Dict]) -> 'CanvasClient':
+    session = CanvasClient()
+    session.headers['Accept'] = 'application/json'
+    update_cookies(session, cookies)
+
+    return session
+
+
+def update_cookies(session: 'requests.Session', cookies: List[Dict]) -> None:
+    for cookie in cookies:
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+    # canvas only accepts cookie authenticated writes with the csrf token echoed back in a header
+    token = session.cookies.get('_csrf_token')
+    if token:
+        session.headers['X-CSRF-Token'] = unquote(token)
+
+
+def get_all(session: 'requests.Session', url: str, params: Dict = None) -> Iterator[Dict]:
+    """
+    Yields every item of a paginated canvas api endpoint by following the Link headers
+    """
+    params = dict(params or {})
+    params.setdefault('per_page', 100)
+
+    while url:
+        response = session.get(url, params=params)
+        response.raise_for_status()
+
+        data = response.json()
+        # some endpoints wrap the list in an object, e.g. {"quiz_submissions": [...]}
+        if isinstance(data, dict):
+            data = next((value for value in data.values() if isinstance(value, list)), None)
+            # a single object, e.g. an error body or an endpoint that isn't paginated
+            if data is None:
+                data = [response.json()]
+        yield from data
+
+        # the next link already carries the query string
+        url = response.links.get('next', {}).get('url')
+        params = None
@@ -0,0 +1,117 @@
+from typing import List, Dict, Tuple, Optional
+from urllib.parse import urlparse
+from utils.api import get_all
+
+
+def split_link(link: str) -> Tuple[str, str]:
+    # e.g. https://onramps.instructure.com/courses/3018432/quizzes/123 -> (https://onramps.instructure.com, 123)
+    parsed = urlparse(link)
+    base = f"{parsed.scheme}://{parsed.netloc}"
+    _id = parsed.path.rstrip('/').split('/')[-1]
+
+    return base, _id
+
+
+def normalize_name(first: str, last: str) -> str:
+    return f"{' '.join(str(first).split())} {' '.join(str(last).split())}".lower()
+
+
+def get_student_ids(session: 'requests.Session', course_link: str) -> Dict[str, int]:
+    """
+    Maps the normalized "first last" name of every student in the course to their canvas user id
+    """
+    base, course_id = split_link(course_link)
+    users = get_all(session, f"{base}/api/v1/courses/{course_id}/users", params={'enrollment_type[]': 'student'})
+
+    ids = {}
+    for user in users:
+        # sortable names are "Last, First", which keeps multi-word last names intact
+        if ', ' in user.get('sortable_name', ''):
+            last, first = user['sortable_name'].split(', ', 1)
+            ids[normalize_name(first, last)] = user['id']
+        ids.setdefault(' '.join(user['name'].split()).lower(), user['id'])
+
+    return ids
+
+
+def add_quiz_extensions(session: 'requests.Session', course_link: str, quiz_link: str, extensions: List[Dict]) -> None:
+    """
+    Submits the extensions for every student of a quiz in a single request
+    """
+    base, course_id = split_link(course_link)
+    _, quiz_id = split_link(quiz_link)
+
+    response = session.post(f"{base}/api/v1/courses/{course_id}/quizzes/{quiz_id}/extensions", json={'quiz_extensions': extensions})
+    response.raise_for_status()
+
+
+def find_quiz(session: 'requests.Session', course_link: str, name: str) -> Optional[Dict]:
+    """
+    Returns the first quiz in the course whose title contains name
+    """
+    base, course_id = split_link(course_link)
+    for quiz in get_all(session, f"{base}/api/v1/courses/{course_id}/quizzes", params={'search_term': name}):
+        if name in quiz['title']:
+            return quiz
+
+    return None
+
+
+def get_first_question_id(session: 'requests.Session', course_link: str, quiz: Dict) -> Optional[int]:
+    base, course_id = split_link(course_link)
+    questions = list(get_all(session, f"{base}/api/v1/courses/{course_id}/quizzes/{quiz['id']}/questions"))
+    if not questions:
+        return None
+
+    return min(questions, key=lambda question: question['position'])['id']
+
+
+def get_quiz_submissions(session: 'requests.Session', course_link: str, quiz: Dict) -> List[Dict]:
+    base, course_id = split_link(course_link)
+    return list(get_all(session, f"{base}/api/v1/courses/{course_id}/quizzes/{quiz['id']}/submissions"))
+
+
+def get_question_points(session: 'requests.Session', course_link: str, quiz: Dict, question_id: int) -> Dict[Tuple[int, int], float]:
+    """
+    Maps (user id, attempt) to the points scored on the given question
+    """
+    base, course_id = split_link(course_link)
+    submissions = get_all(session, f"{base}/api/v1/courses/{course_id}/assignments/{quiz['assignment_id']}/submissions", params={'include[]': 'submission_history'})
+
+    points = {}
+    for submission in submissions:
+        for attempt in submission.get('submission_history') or []:
+            for answer in attempt.get('submission_data') or []:
+                if answer['question_id'] == question_id:
+                    points[(submission['user_id'], attempt.get('attempt'))] = answer.get('points') or 0
+
+    return points
+
+
+def set_fudge_points(session: 'requests.Session', course_link: str, quiz: Dict, quiz_submission: Dict, points: float) -> None:
+    base, course_id = split_link(course_link)
+    url = f"{base}/api/v1/courses/{course_id}/quizzes/{quiz['id']}/submissions/{quiz_submission['id']}"
+
+    response = session.put(url, json={'quiz_submissions': [{'attempt': quiz_submission['attempt'], 'fudge_points': points}]})
+    response.raise_for_status()
+
+
+def get_quiz_extensions(session: 'requests.Session', course_link: str, quiz_link: str) -> Dict[int, int]:
+    """
+    Maps the user id of every student with extra time on the quiz to the number of extra minutes, 0 included
+    """
+    base, course_id = split_link(course_link)
+    _, quiz_id = split_link(quiz_link)
+    submissions = get_all(session, f"{base}/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions")
+
+    return {submission['user_id']: submission['extra_time'] for submission in submissions if submission.get('extra_time') is not None}
+
+
+def get_submitted_student_ids(session: 'requests.Session', course_link: str, assignment_id: int) -> List[int]:
+    """
+    Returns the sorted user ids of every student who has submitted the assignment
+    """
+    base, course_id = split_link(course_link)
+    submissions = get_all(session, f"{base}/api/v1/courses/{course_id}/assignments/{assignment_id}/submissions")
+
+    return sorted(submission['user_id'] for submission in submissions if submission.get('workflow_state') != 'unsubmitted')
@@ -0,0 +1,70 @@
+from typing import List, Dict, Optional
+from time import time
+from dataclasses import asdict
+from threading import Lock
+from utils.courses.course_utils import CourseDescriptor
+import json
+import os
+
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'onramps', 'courses.json')
+
+
+class CourseIndex:
+    """
+    On-disk index of discovered courses per account url, course type and listing page
+    """
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = 7 * 24 * 3600, refresh: int = 0):
+        self.path = path
+        self.ttl = ttl
+        self.refresh = refresh
+        self.entries = self._load()
+        # one index can be shared by the accounts discovered concurrently
+        self.lock = Lock()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        # write to a temporary file first so a crash never leaves a half written index
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with self.lock:
+            with open(tmp, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
+
+    @staticmethod
+    def key(url: str, course: 'Course') -> str:
+        return f"{course.__name__}|{url}"
+
+    def get(self, url: str, course: 'Course', page: str) -> Optional[List['CourseDescriptor']]:
+        entry = self.entries.get(self.key(url, course), {}).get(str(page))
+        if entry is None or time() - entry['fetched'] > self.ttl:
+            return None
+
+        return [CourseDescriptor(**descriptor) for descriptor in entry['courses']]
+
+    def put(self, url: str, course: 'Course', page: str, courses: List['CourseDescriptor']) -> None:
+        with self.lock:
+            pages = self.entries.setdefault(self.key(url, course), {})
+            pages[str(page)] = {'fetched': time(), 'courses': [asdict(descriptor) for descriptor in courses]}
+
+    def last_page(self, url: str, course: 'Course', _range: 'range') -> Optional[int]:
+        # the last page of the range known to have courses, the pages after it are cached empty or not cached at all
+        pages = [page for page in _range if self.get(url, course, page)]
+        return pages[-1] if pages else None
+
+    def stale(self, page: int, _range: 'range', last: Optional[int] = None) -> bool:
+        # the last pages with courses are the only ones that gain new sections during a term,
+        # and once the last one is full they spill over onto the page after it
+        if self.refresh <= 0:
+            return False
+        if last is None:
+            return page in _range[-self.refresh:]
+
+        return last - self.refresh < page <= last + 1
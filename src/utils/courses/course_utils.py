@@ -1,8 +1,12 @@
 from typing import List
 from dataclasses import dataclass
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from utils.api import get_all
+from utils.canvas import split_link
+from utils.extract import LinkIndex
+from utils.wait import waits
+from selenium.common.exceptions import TimeoutException
 
 
 @dataclass
@@ -11,12 +15,43 @@ class CourseDescriptor:
     link: str
 
 
+def course_name(text: str) -> str:
+    # strip the account prefix from the course name
+    return text[text.find('UT'):]
+
+
 class GetLinksMixin:
+    # optional CourseIndex to reuse courses discovered by earlier runs
+    index = None
+
     def get_links(self, driver: 'Driver', url: str, _range: 'range', course: 'Course') -> List['CourseDescriptor']:
         # get course links
         course_links = []
+        empty = []
+        last = self.index.last_page(url, course, _range) if self.index is not None else None
         for page in _range:
-            course_links.extend(self._parse_page(driver, f"{url}page={str(page)}", course))
+            cached = None
+            if self.index is not None and not self.index.stale(page, _range, last):
+                cached = self.index.get(url, course, page)
+
+            if cached is None:
+                cached = self._parse_page(driver, f"{url}page={str(page)}", course)
+                # an empty page between two full ones is usually a timeout, so it's only remembered once it's known to be trailing
+                if not cached:
+                    empty.append(page)
+                elif self.index is not None:
+                    self.index.put(url, course, page, cached)
+
+            if cached:
+                empty = []
+            course_links.extend(cached)
+
+        if self.index is not None:
+            # pages past the end of the listing stay empty, remembering them saves their probe on every run
+            if course_links:
+                for page in empty:
+                    self.index.put(url, course, page, [])
+            self.index.save()
 
         return course_links
 
@@ -26,19 +61,42 @@ class GetLinksMixin:
 
         # wait for page to load
         try:
-            WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, f"//tbody/tr/td/a/span[contains(text(), '{course.ID}')]")))
-        except:
+            waits.until(driver, 'course_listing', EC.element_to_be_clickable((By.XPATH, f"//tbody/tr/td/a/span[contains(text(), '{course.ID}')]")), 5, probe=True)
+        except TimeoutException:
             return []
 
-        # fetch all potential courses
-        elements = [elem for elem in driver.find_elements_by_xpath("//a")]
+        # fetch all potential courses in one round-trip
+        index = LinkIndex.from_driver(driver)
 
         # filter links for valid course numbers
         courses = []
-        for elem in elements:
-            if course.valid(elem):
-                name = elem.text[elem.text.find('UT'):]
-                link = elem.get_attribute('href')
-                courses.append(CourseDescriptor(name=name, link=link))
+        for text, link in index:
+            if course.valid(text, link):
+                courses.append(CourseDescriptor(name=course_name(text), link=link))
+
+        return courses
+
+
+class ApiLinksMixin:
+    def get_api_links(self, session: 'requests.Session', url: str, course: 'Course') -> List['CourseDescriptor']:
+        # page through the account's courses instead of rendering every listing page,
+        # the api has no notion of listing pages, so this is every course of the account
+        base, account = split_link(url)
+        if self.index is not None:
+            cached = self.index.get(url, course, 'api')
+            if cached is not None:
+                return cached
+
+        entries = get_all(session, f"{base}/api/v1/accounts/{account}/courses", params={'search_term': course.ID})
+
+        # filter for valid course numbers
+        courses = []
+        for entry in entries:
+            if course.ID in entry['name']:
+                courses.append(CourseDescriptor(name=course_name(entry['name']), link=f"{base}/courses/{entry['id']}"))
+
+        if self.index is not None:
+            self.index.put(url, course, 'api', courses)
+            self.index.save()
 
-        return courses
\ No newline at end of file
+        return courses
@@ -1,15 +1,14 @@
 from typing import List
-from utils.courses.course_utils import GetLinksMixin
+from utils.courses.course_utils import GetLinksMixin, ApiLinksMixin
 
 
-class CollegeCourse(GetLinksMixin):
+class CollegeCourse(GetLinksMixin, ApiLinksMixin):
     ID = 'UT COLLEGE'
 
-    def valid(element: 'WebElement') -> bool:
-        text = element.text
-        link = element.get_attribute('href')
-
-        if link[32:37] == 'users':
+    def valid(text: str, link: str) -> bool:
+        if len(link) < 7:
+            return False
+        elif link[32:37] == 'users':
             return False
         elif 'UT COLLEGE' not in text:
             return False
@@ -18,18 +17,19 @@ class CollegeCourse(GetLinksMixin):
         else:
             return False
 
-    def get_links(self, driver: 'Driver', url: str, _range: 'range') -> List['CourseDescriptor']:
+    def get_links(self, driver: 'Driver', url: str, _range: 'range', api: bool = False) -> List['CourseDescriptor']:
+        if api:
+            return self.get_api_links(driver.client(), url, self.__class__)
         return super().get_links(driver, url, _range, self.__class__)
         
 
-class HighSchoolCourse(GetLinksMixin):
+class HighSchoolCourse(GetLinksMixin, ApiLinksMixin):
     ID = 'HS'
 
-    def valid(element: 'WebElement') -> bool:
-        text = element.text
-        link = element.get_attribute('href')
-
-        if link[32:37] == 'users':
+    def valid(text: str, link: str) -> bool:
+        if len(link) < 7:
+            return False
+        elif link[32:37] == 'users':
             return False
         elif 'HS' not in text:
             return False
@@ -38,5 +38,7 @@ class HighSchoolCourse(GetLinksMixin):
         else:
             return False
 
-    def get_links(self, driver: 'Driver', url: str, _range: 'range') -> List['CourseDescriptor']:
+    def get_links(self, driver: 'Driver', url: str, _range: 'range', api: bool = False) -> List['CourseDescriptor']:
+        if api:
+            return self.get_api_links(driver.client(), url, self.__class__)
         return super().get_links(driver, url, _range, self.__class__)
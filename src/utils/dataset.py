@@ -0,0 +1,130 @@
+from typing import List, Dict, Optional
+from datetime import datetime, timezone
+from utils.export import course_key, course_from_filename
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+
+# canvas gradebook columns that identify a student rather than a grade
+ID_COLUMNS = ['Student', 'ID', 'SIS User ID', 'SIS Login ID', 'Section']
+
+SCHEMA = pa.schema([
+    ('student', pa.string()),
+    ('student_id', pa.string()),
+    ('section', pa.string()),
+    ('column', pa.string()),
+    ('value', pa.string()),
+    ('exported_at', pa.string()),
+])
+
+MANIFEST = '_manifest.json'
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class GradebookDataset:
+    """
+    Consolidated parquet dataset of every exported gradebook, partitioned by course and stored in long format
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self) -> None:
+        tmp = os.path.join(self.path, f"{MANIFEST}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    def add(self, csv_path: str, course: str = None, chunksize: int = 5000) -> bool:
+        """
+        Streams one gradebook export into the dataset, returns False if the course's export hasn't changed
+        """
+        course = course_key(course) if course else course_from_filename(os.path.basename(csv_path))
+        digest = content_hash(csv_path)
+        entry = self.manifest.get(course)
+        if entry is not None and entry['hash'] == digest:
+            return False
+
+        exported_at = datetime.fromtimestamp(os.path.getmtime(csv_path), timezone.utc).isoformat()
+        directory = os.path.join(self.path, f"course={course}")
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, f"{digest[:16]}.parquet")
+
+        # melt every chunk into (student, column, value) rows so courses with different assignments share a schema
+        tmp = f"{target}.tmp"
+        with pq.ParquetWriter(tmp, SCHEMA) as writer:
+            for chunk in pd.read_csv(csv_path, dtype=str, chunksize=chunksize):
+                # the points possible rows have no student id
+                chunk = chunk[chunk['ID'].notna()] if 'ID' in chunk else chunk
+                ids = [column for column in ID_COLUMNS if column in chunk]
+                long = chunk.melt(id_vars=ids, var_name='column', value_name='value')
+                table = pd.DataFrame({
+                    'student': long.get('Student'),
+                    'student_id': long.get('ID'),
+                    'section': long.get('Section'),
+                    'column': long['column'],
+                    'value': long['value'],
+                    'exported_at': exported_at,
+                })
+                writer.write_table(pa.Table.from_pandas(table, schema=SCHEMA, preserve_index=False))
+        os.replace(tmp, target)
+
+        # drop the superseded export of this course
+        if entry is not None and entry['file'] != os.path.relpath(target, self.path):
+            old = os.path.join(self.path, entry['file'])
+            if os.path.exists(old):
+                os.remove(old)
+
+        self.manifest[course] = {'hash': digest, 'file': os.path.relpath(target, self.path), 'exported_at': exported_at, 'source': csv_path}
+        self._save_manifest()
+
+        return True
+
+    def add_directory(self, directory: str) -> Dict[str, bool]:
+        """
+        Adds the newest csv of every course in the directory, returns whether each one was (re)written
+        """
+        # timestamped browser exports pile up, older ones would overwrite the newest with stale grades
+        newest: Dict[str, str] = {}
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.csv'):
+                continue
+            course = course_from_filename(filename)
+            path = os.path.join(directory, filename)
+            if course not in newest or os.path.getmtime(path) > os.path.getmtime(newest[course]):
+                newest[course] = path
+
+        return {os.path.basename(path): self.add(path, course) for course, path in sorted(newest.items())}
+
+    def query(self, courses: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> 'pd.DataFrame':
+        """
+        Loads only the requested courses and columns, e.g. query(['UT COLLEGE Algebra 001'], ['student', 'column', 'value'])
+        """
+        dataset = ds.dataset(self.path, format='parquet', partitioning='hive', exclude_invalid_files=True)
+        expression = None
+        if courses is not None:
+            expression = ds.field('course').isin([course_key(course) for course in courses])
+
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
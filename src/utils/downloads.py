@@ -0,0 +1,178 @@
+from typing import Dict, List, Optional, Hashable
+from threading import Thread, Condition, Lock
+from utils.export import course_key, course_from_filename
+from time import time
+import ctypes
+import ctypes.util
+import select
+import sys
+import os
+
+
+# files chrome is still writing to, renamed to their final name once complete
+PARTIAL_SUFFIXES = ('.crdownload', '.tmp', '.part')
+
+# where chrome saves downloads when no target directory is given
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), 'Downloads')
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+
+class InotifyWatcher:
+    """
+    Wakes up whenever a file in the directory is finished or renamed
+    """
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float) -> None:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+
+        # drain the queued events, the directory is rescanned afterwards anyway
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+
+    def wait(self, timeout: float) -> None:
+        select.select([], [], [], min(timeout, self.interval))
+
+    def close(self) -> None:
+        pass
+
+
+class DownloadTracker:
+    """
+    Watches a download directory and hands each completed file to the download that triggered it
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.seen = set(self._complete_files())
+        self.pending: List[tuple] = []
+        self.finished: Dict[Hashable, str] = {}
+        self.condition = Condition()
+        self.closed = False
+
+        try:
+            self.watcher = InotifyWatcher(directory) if sys.platform.startswith('linux') else PollingWatcher()
+        except OSError:
+            self.watcher = PollingWatcher()
+
+        self.thread = Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def _complete_files(self) -> List[str]:
+        # dotfiles are chrome's own temporary files, e.g. .com.google.Chrome.abc123
+        return [name for name in os.listdir(self.directory) if not name.endswith(PARTIAL_SUFFIXES) and not name.startswith('.')]
+
+    def _mtime(self, name: str) -> Optional[float]:
+        # a file can be renamed or removed between listing the directory and looking at it
+        try:
+            return os.path.getmtime(os.path.join(self.directory, name))
+        except OSError:
+            return None
+
+    def _watch(self) -> None:
+        while not self.closed:
+            self.watcher.wait(0.5)
+            self._scan()
+
+    def _scan(self) -> None:
+        new = [name for name in self._complete_files() if name not in self.seen]
+        if not new:
+            return
+
+        # oldest first so files line up with the order the downloads were triggered
+        mtimes = {name: self._mtime(name) for name in new}
+        new = sorted((name for name in new if mtimes[name] is not None), key=mtimes.get)
+
+        with self.condition:
+            for name in new:
+                self.seen.add(name)
+                if not self.pending:
+                    continue
+
+                # a file goes to the download expecting its course, otherwise to the oldest download without
+                # an expected course, or the oldest one of all if canvas named the file differently than expected
+                course = course_from_filename(name)
+                match = next((entry for entry in self.pending if entry[1] == course), None)
+                if match is None:
+                    match = next((entry for entry in self.pending if not entry[1]), self.pending[0])
+                self.pending.remove(match)
+                self.finished[match[0]] = os.path.join(self.directory, name)
+
+            self.condition.notify_all()
+
+    def expect(self, key: Hashable, match: Optional[str] = None) -> None:
+        """
+        Registers a download that is about to be triggered, optionally with the course name its file will have
+        """
+        with self.condition:
+            self.pending.append((key, course_key(match) if match else None))
+
+    def wait(self, key: Hashable, timeout: float = 300) -> str:
+        """
+        Blocks until the download registered under key is complete and returns its path
+        """
+        deadline = time() + timeout
+        with self.condition:
+            while key not in self.finished:
+                remaining = deadline - time()
+                if remaining <= 0:
+                    self.cancel(key)
+                    raise TimeoutError(f"Download for {key} did not finish within {timeout} seconds")
+                self.condition.wait(remaining)
+
+            return self.finished.pop(key)
+
+    def cancel(self, key: Hashable) -> None:
+        """
+        Forgets a download that will never arrive, e.g. because triggering it failed, so it can't take another download's file
+        """
+        with self.condition:
+            self.pending = [entry for entry in self.pending if entry[0] != key]
+            self.finished.pop(key, None)
+
+    def close(self) -> None:
+        self.closed = True
+        self.thread.join()
+        self.watcher.close()
+
+
+def download_directory(target_dir: str = '') -> str:
+    return target_dir or DEFAULT_DIRECTORY
+
+
+TRACKERS: Dict[str, DownloadTracker] = {}
+TRACKERS_LOCK = Lock()
+
+
+def tracker_for(directory: str) -> DownloadTracker:
+    """
+    Returns the one tracker for a directory, so drivers downloading into the same place don't race for the same files
+    """
+    directory = os.path.abspath(directory)
+    with TRACKERS_LOCK:
+        if directory not in TRACKERS:
+            TRACKERS[directory] = DownloadTracker(directory)
+
+        return TRACKERS[directory]
@@ -1,15 +1,306 @@
+from typing import List, Dict
+from dataclasses import dataclass
 from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.remote.webelement import WebElement
+from contextlib import nullcontext
+from utils.api import session_from_driver, update_cookies
+from utils.canvas import split_link
+from utils.trace import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
+import os
+
+
+DRIVER_PATH_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'onramps', 'chromedriver')
+
+
+@dataclass
+class DriverProfile:
+    headless: bool = False
+    page_load_strategy: str = 'normal'
+    block_resources: bool = False
+
+
+PROFILES: Dict[str, DriverProfile] = {
+    'default': DriverProfile(),
+    'fast': DriverProfile(page_load_strategy='eager', block_resources=True),
+    # headless can't complete the manual login, so it needs a saved session
+    'headless': DriverProfile(headless=True, page_load_strategy='eager', block_resources=True),
+}
+
+# fonts and media never matter for scraping, images are blocked through the content settings
+BLOCKED_URLS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*.mp4', '*.webm', '*.mp3', '*.ogg', '*.wav']
+
+
+def landing_page(url: str) -> str:
+    # a page on the canvas origin that never redirects to the sso login, so cookies can be added for its domain
+    base, _ = split_link(url)
+    return f"{base}/favicon.ico"
+
+
+def get_driver_path(refresh: bool = False) -> str:
+    """
+    Returns a locally cached chromedriver so launching doesn't need a network version check
+    """
+    # an explicitly pinned binary always wins
+    if os.environ.get('CHROMEDRIVER_PATH'):
+        return os.environ['CHROMEDRIVER_PATH']
+
+    if not refresh and os.path.exists(DRIVER_PATH_CACHE):
+        with open(DRIVER_PATH_CACHE) as f:
+            path = f.read().strip()
+        if os.path.exists(path):
+            return path
+
+    # fall back to webdriver_manager once and remember where it put the binary
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+    with open(DRIVER_PATH_CACHE, 'w') as f:
+        f.write(path)
+
+    return path
+
+
+class TracedWebElement(WebElement):
+    def click(self):
+        tracer = getattr(self.parent, 'tracer', None)
+        if tracer is None:
+            return super().click()
+
+        with tracer.span('click'):
+            return super().click()
+
 
 class Driver(webdriver.Chrome):
+    # optional Tracer, everything below is a plain passthrough while it's unset
+    tracer = None
+    # optional TabPool of pages preloaded in background tabs
+    tabs = None
+    # optional Recycler that restarts the browser once it has loaded too many pages or grown too large
+    recycler = None
+    # optional Quarantine collecting the units of work that kept failing
+    quarantine = None
+    _web_element_cls = TracedWebElement
+
     @classmethod
-    def initialize(cls, target_dir=""):
+    def initialize(cls, target_dir="", profile='default'):
+        settings = PROFILES[profile]
         options = Options()
+        prefs = {}
         if target_dir:
-            prefs = {
-                "download.default_directory": target_dir
-            }
+            prefs["download.default_directory"] = target_dir
+        if settings.block_resources:
+            prefs["profile.managed_default_content_settings.images"] = 2
+        if prefs:
             options.add_experimental_option('prefs', prefs)
+        if settings.headless:
+            options.add_argument('--headless')
+            options.add_argument('--window-size=1920,1080')
+        capabilities = {'pageLoadStrategy': settings.page_load_strategy}
+
         setattr(cls, 'download_directory', target_dir)
-        return cls(ChromeDriverManager().install(), options=options)
\ No newline at end of file
+        path = get_driver_path()
+        try:
+            driver = cls(path, options=options, desired_capabilities=capabilities)
+        except SessionNotCreatedException:
+            # the cached chromedriver no longer matches the installed chrome
+            path = get_driver_path(refresh=True)
+            driver = cls(path, options=options, desired_capabilities=capabilities)
+
+        driver.profile = profile
+        # kept so the browser can be restarted with the same settings
+        driver._launch = (path, options, capabilities)
+        driver._configure()
+
+        return driver
+
+    def _configure(self) -> None:
+        settings = PROFILES[self.profile]
+        if settings.headless and self.download_directory:
+            # headless chrome refuses downloads unless they are explicitly allowed, for every tab of the browser
+            self.execute_cdp_cmd('Browser.setDownloadBehavior', {'behavior': 'allow', 'downloadPath': self.download_directory})
+        self._configure_tab()
+
+    def _configure_tab(self) -> None:
+        # blocking only applies to the tab it was set up in
+        if PROFILES[self.profile].block_resources:
+            self.execute_cdp_cmd('Network.enable', {})
+            self.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+
+    def open_tab(self, url: str) -> str:
+        """
+        Starts loading url in a new background tab set up like the first one and returns its handle, without leaving the current tab
+        """
+        current = self.current_window_handle
+        before = set(self.window_handles)
+        webdriver.Chrome.execute_script(self, "window.open('about:blank', '_blank');")
+        handle = (set(self.window_handles) - before).pop()
+
+        # the blank page loads nothing, so the tab is set up before the real page starts loading
+        self.switch_to.window(handle)
+        self._configure_tab()
+        webdriver.Chrome.execute_script(self, "window.location.href = arguments[0];", url)
+        self.switch_to.window(current)
+
+        return handle
+
+    def share_session(self, driver: 'Driver', url: str) -> None:
+        self.load_cookies(driver.get_cookies(), url)
+
+    def load_cookies(self, cookies: List[Dict], url: str) -> None:
+        # cookies can only be added for the domain that is currently loaded, url itself would redirect to the login
+        self.get(landing_page(url))
+        for cookie in cookies:
+            self.add_cookie(cookie)
+
+        # reload as the authenticated user
+        self.get(url)
+
+    def client(self) -> 'CanvasClient':
+        # one pooled http client per driver, authenticated with the driver's cookies
+        if getattr(self, '_client', None) is None:
+            self._client = session_from_driver(self)
+        else:
+            # canvas rotates the session and csrf cookies as the browser navigates, or after a login or recycle
+            update_cookies(self._client, self.get_cookies())
+
+        return self._client
+
+    def trace(self, **tags):
+        # tag the spans recorded inside the block, e.g. with the course being worked on
+        return self.tracer.tag(**tags) if self.tracer is not None else nullcontext()
+
+    @property
+    def main_window(self) -> str:
+        # the tab the course is being worked on, as opposed to survey or SpeedGrader tabs
+        return self.tabs.main if self.tabs is not None else self.window_handles[0]
+
+    def switch_to_new_window(self, before: List[str]) -> None:
+        # wait for the tab opened since the handles in before were taken and switch to it
+        opened = WebDriverWait(self, 5).until(lambda driver: set(driver.window_handles) - set(before))
+        self.switch_to.window(opened.pop())
+
+    def prefetch(self, urls: List[str]) -> None:
+        if self.tabs is not None:
+            self.tabs.prefetch(list(urls))
+
+    def recycle(self, reason: str, url: str = None) -> None:
+        """
+        Restarts the browser, restoring its cookies, open tabs and the page being worked on, or url instead of it
+        """
+        # preloaded tabs are dropped, the next prefetch opens them again
+        preloaded = self.tabs.handles if self.tabs is not None else []
+        handles = [handle for handle in self.window_handles if handle not in preloaded]
+        current = handles.index(self.current_window_handle) if self.current_window_handle in handles else 0
+        main = handles.index(self.main_window)
+
+        urls = []
+        for handle in handles:
+            self.switch_to.window(handle)
+            urls.append(self.current_url)
+        if url is not None:
+            urls[current] = url
+
+        # the session cookies all belong to the canvas domain of the main tab
+        self.switch_to.window(handles[main])
+        cookies = self.get_cookies()
+        event = self.recycler.record(reason, urls[current])
+        print(f"Recycling the browser after {event.pages} pages ({reason}, {event.rss_mb} MB)")
+
+        with self.tracer.span('recycle', reason) if self.tracer is not None else nullcontext():
+            webdriver.Chrome.quit(self)
+            path, options, capabilities = self._launch
+            webdriver.Chrome.__init__(self, path, options=options, desired_capabilities=capabilities)
+            self._configure()
+
+            # cookies can only be added for the domain that is currently loaded, the tabs' pages would redirect to the login
+            webdriver.Chrome.get(self, landing_page(urls[main]))
+            for cookie in cookies:
+                self.add_cookie(cookie)
+
+            # reopen the tabs in their original order
+            webdriver.Chrome.get(self, urls[0])
+            restored = [self.current_window_handle]
+            for tab_url in urls[1:]:
+                restored.append(self.open_tab(tab_url))
+
+        if self.tabs is not None:
+            self.tabs.main = restored[main]
+            self.tabs.tabs = {}
+        self.switch_to.window(restored[current])
+
+    def _recycle_reason(self, main_only: bool = True) -> str:
+        if self.recycler is None:
+            return ''
+
+        reason = self.recycler.due(self.service.process.pid)
+        if not reason:
+            return ''
+
+        # a restart would lose the frame being worked in or a half filled form in another tab, e.g. a survey,
+        # so it waits for the next navigation at a safe point
+        if main_only and self.current_window_handle != self.main_window:
+            return ''
+        if webdriver.Chrome.execute_script(self, "return window.self !== window.top;"):
+            return ''
+
+        return reason
+
+    def checkpoint(self) -> None:
+        """
+        Counts a navigation that doesn't go through get, e.g. clicking through to the next student in SpeedGrader,
+        and recycles the browser there if it's due
+        """
+        reason = self._recycle_reason(main_only=False)
+        if reason:
+            self.recycle(reason)
+
+    def get(self, url):
+        # restart a browser that has grown too large instead of loading another page in it
+        reason = self._recycle_reason()
+        if reason:
+            return self.recycle(reason, url)
+
+        # hand over a tab that already loaded the page in the background
+        if self.tabs is not None and self.tabs.take(url):
+            return
+
+        if self.tracer is None:
+            return super().get(url)
+
+        with self.tracer.span('get', url):
+            return super().get(url)
+
+    def refresh(self):
+        # a restarted browser reloads the current page anyway
+        reason = self._recycle_reason()
+        if reason:
+            return self.recycle(reason)
+
+        if self.tracer is None:
+            return super().refresh()
+
+        with self.tracer.span('refresh'):
+            return super().refresh()
+
+    def find_element(self, by='id', value=None):
+        if self.tracer is None:
+            return super().find_element(by, value)
+
+        with self.tracer.span('find', value):
+            return super().find_element(by, value)
+
+    def find_elements(self, by='id', value=None):
+        if self.tracer is None:
+            return super().find_elements(by, value)
+
+        with self.tracer.span('find', value):
+            return super().find_elements(by, value)
+
+    def execute_script(self, script, *args):
+        if self.tracer is None:
+            return super().execute_script(script, *args)
+
+        with self.tracer.span('script'):
+            return super().execute_script(script, *args)
@@ -0,0 +1,92 @@
+from typing import List, Dict, Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from utils.canvas import split_link
+import asyncio
+import os
+import re
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def safe_filename(name: str) -> str:
+    return re.sub(r'[^\w\-. ]', '_', name).strip()
+
+
+def course_key(name: str) -> str:
+    # canvas replaces spaces and punctuation in the names of browser exports, so names only compare once normalized
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def course_from_filename(filename: str) -> str:
+    # browser exports are named like 2020-11-05T1234_Grades-COURSE.csv and api exports like COURSE.csv,
+    # both normalize to the same key, chrome appends " (1)" to a name that is already taken
+    stem = re.sub(r' \(\d+\)$', '', os.path.splitext(filename)[0])
+    return course_key(stem.split('_Grades-', 1)[1] if '_Grades-' in stem else stem)
+
+
+class GradebookExporter:
+    """
+    Runs gradebook csv exports for many courses at once over the browser's session
+    """
+    def __init__(self, session: 'requests.Session', target_dir: str, concurrency: int = 8, poll: float = 1.0):
+        self.session = session
+        self.target_dir = target_dir
+        self.concurrency = concurrency
+        self.poll = poll
+
+    async def _call(self, func, *args, **kwargs):
+        # requests is blocking, so every call runs on the executor
+        return await self.loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def _json(self, method: str, url: str, **kwargs) -> Dict:
+        response = await self._call(self.session.request, method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def _stream(self, url: str, path: str) -> None:
+        with self.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            tmp = f"{path}.part"
+            with open(tmp, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(tmp, path)
+
+    async def export_course(self, course_link: 'CourseDescriptor') -> str:
+        base, course_id = split_link(course_link.link)
+        async with self.semaphore:
+            # start the export job
+            job = await self._json('POST', f"{base}/courses/{course_id}/gradebook_csv")
+
+            # poll until canvas has built the csv
+            while True:
+                progress = await self._json('GET', f"{base}/api/v1/progress/{job['progress_id']}")
+                if progress['workflow_state'] == 'completed':
+                    break
+                if progress['workflow_state'] == 'failed':
+                    raise RuntimeError(f"Gradebook export failed for {course_link.name}: {progress.get('message')}")
+                await asyncio.sleep(self.poll)
+
+            # stream the attachment to disk
+            attachment = await self._json('GET', f"{base}/api/v1/files/{job['attachment_id']}")
+            path = os.path.join(self.target_dir, safe_filename(f"{course_link.name}.csv"))
+            await self._call(self._stream, attachment['url'], path)
+
+        return path
+
+    async def export_all(self, course_links: List['CourseDescriptor']) -> Dict[str, Union[str, Exception]]:
+        self.loop = asyncio.get_event_loop()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as self.executor:
+            results = await asyncio.gather(*(self.export_course(course_link) for course_link in course_links), return_exceptions=True)
+
+        return {course_link.link: result for course_link, result in zip(course_links, results)}
+
+    def run(self, course_links: List['CourseDescriptor']) -> Dict[str, Union[str, Exception]]:
+        """
+        Exports every course and returns the path of each csv, or the exception it failed with, by course link
+        """
+        os.makedirs(self.target_dir, exist_ok=True)
+        return asyncio.run(self.export_all(course_links))
@@ -0,0 +1,29 @@
+from typing import List, Tuple, Optional, Iterator
+
+
+# every anchor's visible text and absolute href in a single round-trip
+ANCHORS_SCRIPT = "return Array.from(document.querySelectorAll('a'), a => [a.innerText || a.textContent || '', a.href || '']);"
+
+
+class LinkIndex:
+    """
+    In-memory index of the text and href of every link on a page
+    """
+    def __init__(self, anchors: List[Tuple[str, str]]):
+        self.anchors = [(' '.join(text.split()), href) for text, href in anchors]
+
+    @classmethod
+    def from_driver(cls, driver: 'Driver') -> 'LinkIndex':
+        return cls(driver.execute_script(ANCHORS_SCRIPT))
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.anchors)
+
+    def __len__(self) -> int:
+        return len(self.anchors)
+
+    def find(self, text: str) -> Optional[str]:
+        """
+        Returns the href of the first link whose text contains the given text
+        """
+        return next((href for name, href in self.anchors if text in name), None)
@@ -0,0 +1,60 @@
+from typing import Set, Tuple
+from threading import Lock
+import json
+import os
+
+
+class Journal:
+    """
+    Append-only record of completed units of work so an interrupted run can skip them on restart,
+    keys start with a link and the task, e.g. (course link, 'download'), so scripts can share one journal
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._repair()
+        self.completed = self._load()
+        self.lock = Lock()
+        self.file = open(path, 'a')
+
+    def _repair(self) -> None:
+        # cut a line torn by a crash so the next record doesn't get appended onto it
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _load(self) -> Set[Tuple]:
+        completed = set()
+        if not os.path.exists(self.path):
+            return completed
+
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    completed.add(tuple(json.loads(line)))
+                except ValueError:
+                    # the last line may be torn if the process died mid-write
+                    continue
+
+        return completed
+
+    def __contains__(self, key: Tuple) -> bool:
+        return tuple(str(part) for part in key) in self.completed
+
+    def record(self, *key) -> None:
+        key = tuple(str(part) for part in key)
+        with self.lock:
+            self.file.write(json.dumps(key) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.completed.add(key)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def open_journal(path: str) -> 'Journal':
+    return Journal(path) if path else None
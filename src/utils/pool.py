@@ -0,0 +1,152 @@
+from typing import List, Callable, Any
+from dataclasses import dataclass, field
+from threading import Thread
+from queue import Queue, Empty
+from utils.driver import Driver
+from utils.utils import get_quarantine
+
+
+@dataclass
+class CourseResult:
+    course: 'CourseDescriptor'
+    success: bool
+    error: str = ""
+    task: str = ""
+
+
+@dataclass
+class Report:
+    results: List[CourseResult] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[CourseResult]:
+        return [result for result in self.results if result.success]
+
+    @property
+    def failed(self) -> List[CourseResult]:
+        return [result for result in self.results if not result.success]
+
+    def summary(self) -> str:
+        lines = [f"{len(self.succeeded)} succeeded, {len(self.failed)} failed"]
+
+        # break the counts down by task when several tasks ran per course
+        tasks = sorted({result.task for result in self.results if result.task})
+        for task in tasks:
+            succeeded = sum(1 for result in self.succeeded if result.task == task)
+            failed = sum(1 for result in self.failed if result.task == task)
+            lines.append(f"  {task}: {succeeded} succeeded, {failed} failed")
+
+        for result in self.failed:
+            task = f" [{result.task}]" if result.task else ""
+            lines.append(f"  {result.course.name} ({result.course.link}){task}: {result.error}")
+
+        return "\n".join(lines)
+
+
+def reset_tabs(driver: 'Driver') -> None:
+    """
+    Closes every tab opened while working on a course, e.g. SpeedGrader or a survey, and switches back to the main tab
+    """
+    main = driver.main_window
+    preloaded = driver.tabs.handles if driver.tabs is not None else []
+    for handle in driver.window_handles:
+        if handle != main and handle not in preloaded:
+            driver.switch_to.window(handle)
+            driver.close()
+    driver.switch_to.window(main)
+
+
+def run_course(driver: 'Driver', course_link: 'CourseDescriptor', task: Callable[['Driver', 'CourseDescriptor'], None], name: str = "") -> CourseResult:
+    """
+    Runs the task for a single course and records whether it succeeded
+    """
+    try:
+        task(driver, course_link)
+    except Exception as e:
+        # the course is left out of the rest of the run and listed in the failure manifest under the task that failed
+        get_quarantine(driver).record('course', (course_link.link, name) if name else (course_link.link,), e)
+
+        # reset to the main tab so the next course starts from a known state
+        try:
+            reset_tabs(driver)
+        except Exception:
+            # the browser itself is gone, the course still gets its failure record
+            pass
+        return failure(course_link, e, name)
+
+    return CourseResult(course=course_link, success=True, task=name)
+
+
+def failure(course_link: 'CourseDescriptor', error: Exception, task: str = "") -> CourseResult:
+    return CourseResult(course=course_link, success=False, error=f"{type(error).__name__}: {error}", task=task)
+
+
+def start_workers(driver: 'Driver', urls: List[str], count: int) -> List['Driver']:
+    """
+    Starts count additional drivers that share the session the already logged in driver has for every url
+    """
+    workers = []
+    for _ in range(count):
+        worker = Driver.initialize(driver.download_directory, driver.profile)
+        worker.tracer = driver.tracer
+        if driver.recycler is not None:
+            worker.recycler = driver.recycler.fork()
+        worker.quarantine = driver.quarantine
+        for url in urls:
+            # cookies can only be read for the domain that is currently loaded
+            if len(urls) > 1:
+                driver.get(url)
+            worker.share_session(driver, url)
+        workers.append(worker)
+
+    return workers
+
+
+def run_queue(drivers: List['Driver'], items: List[Any], work: Callable[['Driver', Any], Any], failed: Callable[[Any, Exception], Any]) -> List[Any]:
+    """
+    Runs work for every item on whichever driver is free next, returns the results in the order of items,
+    with failed building the result of an item whose work raised
+    """
+    # shared queue so drivers that finish early pick up the remaining items
+    queue = Queue()
+    for i, item in enumerate(items):
+        queue.put((i, item))
+
+    results: List[Any] = [None] * len(items)
+
+    def worker_loop(worker: 'Driver') -> None:
+        while True:
+            try:
+                i, item = queue.get_nowait()
+            except Empty:
+                return
+            # a dead browser must not take its thread down with it and leave the item without a result
+            try:
+                results[i] = work(worker, item)
+            except Exception as e:
+                results[i] = failed(item, e)
+
+    # each driver is its own browser process, so threads are enough to keep them all busy
+    threads = [Thread(target=worker_loop, args=(worker,)) for worker in drivers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+def run_pool(driver: 'Driver', url: str, course_links: List['CourseDescriptor'], task: Callable[['Driver', 'CourseDescriptor'], None], workers: int, name: str = "") -> Report:
+    """
+    Splits the courses across a pool of drivers that share the session of the already logged in driver
+    """
+    # start the additional drivers and hand them the authenticated session
+    drivers = [driver] + start_workers(driver, [url], min(workers, len(course_links)) - 1)
+
+    results = run_queue(drivers, course_links, lambda worker, course_link: run_course(worker, course_link, task, name), lambda course_link, e: failure(course_link, e, name))
+
+    # shut down the extra browsers
+    for worker in drivers[1:]:
+        worker.quit()
+
+    return Report(results=results)
@@ -0,0 +1,118 @@
+from typing import List, Dict
+from dataclasses import dataclass
+from time import time
+import os
+
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def child_pids() -> Dict[int, List[int]]:
+    # parent to children map of every process visible in /proc
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+
+        # the command name can contain spaces, the fields after it can't
+        ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    return children
+
+
+def process_tree_rss(pid: int) -> int:
+    """
+    Returns the resident memory in bytes of pid and all of its descendants, 0 where /proc isn't available
+    """
+    if not os.path.isdir('/proc'):
+        return 0
+
+    children = child_pids()
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except OSError:
+            # the process exited while walking the tree
+            continue
+
+    return total
+
+
+@dataclass
+class RecyclePolicy:
+    # 0 disables a limit
+    max_rss_mb: float = 0
+    max_pages: int = 0
+    # reading the process tree isn't free, so memory is only checked every few pages
+    check_every: int = 10
+
+
+@dataclass
+class RecycleEvent:
+    time: float
+    reason: str
+    pages: int
+    rss_mb: float
+    url: str
+
+
+class Recycler:
+    """
+    Counts the pages a browser has loaded and decides when it has to be restarted
+    """
+    def __init__(self, policy: RecyclePolicy, events: List[RecycleEvent] = None):
+        self.policy = policy
+        self.pages = 0
+        self.rss_mb = 0.0
+        self.pending = ''
+        # shared between the drivers of a pool so a single report covers all of them
+        self.events = events if events is not None else []
+
+    def fork(self) -> 'Recycler':
+        return Recycler(self.policy, self.events)
+
+    def due(self, pid: int) -> str:
+        """
+        Counts a navigation, returns why the browser should be recycled first or an empty string,
+        a reason stays pending until the browser is recycled at a safe point
+        """
+        self.pages += 1
+        if self.pending:
+            return self.pending
+
+        if self.policy.max_pages and self.pages > self.policy.max_pages:
+            self.pending = 'pages'
+        elif self.policy.max_rss_mb and self.pages % self.policy.check_every == 0:
+            self.rss_mb = process_tree_rss(pid) / 2 ** 20
+            if self.rss_mb > self.policy.max_rss_mb:
+                self.pending = 'rss'
+
+        return self.pending
+
+    def record(self, reason: str, url: str) -> RecycleEvent:
+        event = RecycleEvent(time=time(), reason=reason, pages=self.pages, rss_mb=round(self.rss_mb, 1), url=url)
+        self.events.append(event)
+        self.pages = 0
+        self.rss_mb = 0.0
+        self.pending = ''
+
+        return event
+
+    def report(self) -> None:
+        if not self.events:
+            return
+
+        print(f"Browser recycled {len(self.events)} times")
+        for event in self.events:
+            print(f"  after {event.pages} pages ({event.reason}, {event.rss_mb} MB) at {event.url}")
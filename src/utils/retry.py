@@ -0,0 +1,142 @@
+from typing import List, Tuple, Callable, Any
+from dataclasses import dataclass, asdict
+from threading import Lock
+from random import uniform
+from time import sleep
+import json
+import os
+
+from selenium.common.exceptions import (
+    StaleElementReferenceException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    TimeoutException,
+    NoSuchFrameException,
+)
+import requests
+
+
+# failures that usually pass once the page has settled or the element is looked up again,
+# anything else, e.g. a missing element or a closed window, will fail the same way on every attempt
+TRANSIENT = (
+    StaleElementReferenceException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    TimeoutException,
+    NoSuchFrameException,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+
+
+def is_transient(error: Exception) -> bool:
+    return isinstance(error, TRANSIENT)
+
+
+def describe_error(error: Exception) -> str:
+    # selenium messages carry a stacktrace after the first line
+    lines = str(error).strip().splitlines()
+    return f"{type(error).__name__}: {lines[0]}" if lines else type(error).__name__
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 5
+
+    def call(self, func: Callable[[], Any], reset: Callable[[], None] = None, attempts: int = None) -> Any:
+        """
+        Calls func until it succeeds, retrying transient failures with jittered exponential backoff,
+        reset runs before each retry, e.g. to reload the page so func locates its elements again
+        """
+        # func always runs at least once, otherwise a unit would count as done without any work
+        attempts = max(1, attempts if attempts is not None else self.attempts)
+        for attempt in range(1, attempts + 1):
+            try:
+                return func()
+            except Exception as e:
+                if attempt == attempts or not is_transient(e):
+                    raise
+
+            sleep(uniform(0.5, 1) * min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+            if reset is not None:
+                reset()
+
+
+@dataclass
+class Failure:
+    # course, student or submission
+    kind: str
+    # always starts with the course link and task, e.g. [course link, accommodate, assignment, first, last]
+    key: List[str]
+    error: str
+    transient: bool
+
+
+class Quarantine:
+    """
+    Isolates units of work that keep failing so the rest of the batch continues, and writes them to a failure manifest
+    that a later run can take as its input to retry only those units
+    """
+    def __init__(self, policy: RetryPolicy = None, path: str = None, previous: str = None):
+        self.policy = policy or RetryPolicy()
+        self.path = path
+        self.failures: List[Failure] = []
+        self.lock = Lock()
+        # keys that failed in the run being retried, None processes everything
+        self.previous = self.load(previous) if previous else None
+
+    @staticmethod
+    def load(path: str) -> List[Tuple[str, ...]]:
+        with open(path) as f:
+            return [tuple(failure['key']) for failure in json.load(f)['failures']]
+
+    def selected(self, *key) -> bool:
+        """
+        Whether a unit is part of this run, a failed course selects all of its students and a failed student selects its course
+        """
+        if self.previous is None:
+            return True
+
+        key = tuple(str(part) for part in key)
+        return any(failed[:len(key)] == key or key[:len(failed)] == failed for failed in self.previous)
+
+    def retrying(self, *key) -> bool:
+        # whether the unit itself failed in the run being retried, rather than everything running as usual
+        return self.previous is not None and self.selected(*key)
+
+    def record(self, kind: str, key: Tuple, error: Exception) -> None:
+        with self.lock:
+            self.failures.append(Failure(kind=kind, key=[str(part) for part in key], error=describe_error(error), transient=is_transient(error)))
+
+    def run(self, kind: str, key: Tuple, func: Callable[[], Any], reset: Callable[[], None] = None, attempts: int = None) -> bool:
+        """
+        Runs func under the retry policy, returns False and quarantines the unit if it still fails
+        """
+        try:
+            self.policy.call(func, reset, attempts)
+        except Exception as e:
+            self.record(kind, key, e)
+            return False
+
+        return True
+
+    def save(self) -> None:
+        with open(self.path, 'w') as f:
+            json.dump({'failures': [asdict(failure) for failure in self.failures]}, f, indent=2)
+
+    def close(self) -> None:
+        if not self.failures:
+            # don't leave the failures of an earlier run behind once they all went through
+            if self.path and os.path.exists(self.path):
+                self.save()
+            return
+
+        print(f"{len(self.failures)} units failed")
+        for failure in self.failures:
+            print(f"  {failure.kind} {' / '.join(failure.key)}: {failure.error}")
+
+        if self.path:
+            self.save()
+            print(f"Rerun with --only-failed {self.path} to retry just these")
@@ -0,0 +1,76 @@
+from typing import List, Dict, Optional
+from time import time
+from utils.api import session_from_cookies
+from cryptography.fernet import Fernet, InvalidToken
+import json
+import os
+
+
+CONFIG_DIR = os.path.join(os.path.expanduser('~'), '.config', 'onramps')
+DEFAULT_PATH = os.path.join(CONFIG_DIR, 'session.enc')
+DEFAULT_KEY_PATH = os.path.join(CONFIG_DIR, 'session.key')
+
+
+def write_private(path: str, data: bytes) -> None:
+    # only the current user may read the session or its key
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+
+class SessionStore:
+    """
+    Encrypted on-disk copy of the authenticated canvas cookies so later runs can skip the manual login
+    """
+    def __init__(self, path: str = DEFAULT_PATH, key_path: str = DEFAULT_KEY_PATH):
+        self.path = path
+        self.key_path = key_path
+
+    def _fernet(self) -> 'Fernet':
+        # the key can come from the environment so it never has to live next to the session
+        key = os.environ.get('ONRAMPS_SESSION_KEY')
+        if key:
+            return Fernet(key.encode())
+
+        if not os.path.exists(self.key_path):
+            write_private(self.key_path, Fernet.generate_key())
+        with open(self.key_path, 'rb') as f:
+            return Fernet(f.read())
+
+    def save(self, cookies: List[Dict]) -> None:
+        data = json.dumps({'saved': time(), 'cookies': cookies}).encode()
+        write_private(self.path, self._fernet().encrypt(data))
+
+    def load(self) -> Optional[List[Dict]]:
+        """
+        Returns the saved cookies that haven't expired, or None if there is no usable session
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = json.loads(self._fernet().decrypt(f.read()))
+        except (OSError, InvalidToken, ValueError):
+            return None
+
+        now = time()
+        cookies = [cookie for cookie in data['cookies'] if cookie.get('expiry') is None or cookie['expiry'] > now]
+        return cookies or None
+
+    def valid(self, base: str, cookies: List[Dict]) -> bool:
+        # canvas answers 401 once the session behind the cookies has expired
+        try:
+            response = session_from_cookies(cookies).get(f"{base}/api/v1/users/self", timeout=10)
+        except OSError:
+            return False
+
+        return response.status_code == 200
+
+    def session(self, base: str) -> Optional['requests.Session']:
+        """
+        Returns an authenticated requests session for http-only clients, or None if the saved session has expired
+        """
+        cookies = self.load()
+        if cookies is None or not self.valid(base, cookies):
+            return None
+
+        return session_from_cookies(cookies)
@@ -0,0 +1,61 @@
+from typing import List, Dict, Optional
+
+
+class TabPool:
+    """
+    Preloads upcoming pages in background tabs and swaps them in when the driver navigates to them
+    """
+    def __init__(self, driver: 'Driver', size: int = 2):
+        self.driver = driver
+        self.size = size
+        self.main = driver.current_window_handle
+        self.tabs: Dict[str, str] = {}
+        self.expected: Optional[str] = None
+
+    @property
+    def handles(self) -> List[str]:
+        return list(self.tabs.values())
+
+    def prefetch(self, urls: List[str]) -> None:
+        """
+        Starts loading the next pages in background tabs, up to the size of the pool
+        """
+        # a tab for a page that isn't coming up anymore would never be taken and keep its slot forever,
+        # except the head of the previous call, which is the page about to be worked on and taken next
+        upcoming = urls[:self.size]
+        self.discard([url for url in self.tabs if url not in upcoming and url != self.expected])
+        self.expected = upcoming[0] if upcoming else None
+
+        for url in upcoming:
+            if len(self.tabs) >= self.size:
+                break
+            if url in self.tabs:
+                continue
+
+            # the tab loads the page without moving the driver off the current tab
+            self.tabs[url] = self.driver.open_tab(url)
+
+    def take(self, url: str) -> bool:
+        """
+        Makes the preloaded tab for url the main tab, returns False if the page has to be loaded normally
+        """
+        if url not in self.tabs or self.driver.current_window_handle != self.main:
+            return False
+
+        # the old main tab is done with, the preloaded one replaces it
+        handle = self.tabs.pop(url)
+        self.driver.close()
+        self.driver.switch_to.window(handle)
+        self.main = handle
+
+        return True
+
+    def discard(self, urls: List[str]) -> None:
+        if not urls:
+            return
+
+        current = self.driver.current_window_handle
+        for url in urls:
+            self.driver.switch_to.window(self.tabs.pop(url))
+            self.driver.close()
+        self.driver.switch_to.window(current)
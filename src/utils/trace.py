@@ -0,0 +1,136 @@
+from typing import Dict, List, Tuple
+from contextlib import contextmanager
+from collections import defaultdict
+from threading import Lock, local
+from time import time, perf_counter
+import json
+import sys
+import os
+
+from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def caller_step() -> str:
+    # the step is the innermost function of the scripts themselves, not of utils or selenium
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if f"{os.sep}utils{os.sep}" not in filename and f"{os.sep}selenium{os.sep}" not in filename and 'contextlib' not in filename:
+            return frame.f_code.co_name
+        frame = frame.f_back
+
+    return ''
+
+
+class Tracer:
+    """
+    Records a timed span for every navigation, wait, find and click to a JSONL trace
+    """
+    def __init__(self, path: str, script: str = None):
+        self.path = path
+        self.script = script or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+        self.file = open(path, 'a')
+        self.lock = Lock()
+        self.state = local()
+        self.durations: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        if not hasattr(self.state, 'tags'):
+            self.state.tags = {}
+        return self.state.tags
+
+    @contextmanager
+    def tag(self, **tags):
+        previous = dict(self.tags)
+        self.tags.update(tags)
+        try:
+            yield
+        finally:
+            self.state.tags = previous
+
+    @contextmanager
+    def span(self, kind: str, detail: str = ''):
+        # finds polled inside a wait are part of the wait, not spans of their own
+        if getattr(self.state, 'nested', False):
+            yield
+            return
+
+        step = self.tags.get('step') or caller_step()
+        self.state.nested = True
+        start = perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = perf_counter() - start
+            self.state.nested = False
+            self.record(kind, detail, step, duration, error)
+
+    def record(self, kind: str, detail: str, step: str, duration: float, error: str = None) -> None:
+        entry = {'time': time(), 'script': self.script, 'course': self.tags.get('course', ''), 'step': step, 'kind': kind, 'detail': detail, 'duration': round(duration, 6)}
+        if error:
+            entry['error'] = error
+
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.durations[(step, kind)].append(duration)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns count, total, p50 and p95 seconds by step and kind
+        """
+        return {
+            f"{step}:{kind}": {
+                'count': len(values),
+                'total': round(sum(values), 3),
+                'p50': round(percentile(values, 50), 3),
+                'p95': round(percentile(values, 95), 3),
+            }
+            for (step, kind), values in sorted(self.durations.items())
+        }
+
+    def close(self) -> None:
+        summary = self.summary()
+        with self.lock:
+            self.file.write(json.dumps({'script': self.script, 'summary': summary}) + "\n")
+            self.file.close()
+
+        print(f"{'step':<40}{'count':>8}{'total':>10}{'p50':>8}{'p95':>8}")
+        for key, stats in summary.items():
+            print(f"{key:<40}{stats['count']:>8}{stats['total']:>10}{stats['p50']:>8}{stats['p95']:>8}")
+
+
+def describe(method) -> str:
+    # expected conditions keep their locator around, e.g. (By.XPATH, "//a")
+    locator = getattr(method, 'locator', None) or getattr(method, 'frame_locator', None)
+    return locator[1] if isinstance(locator, tuple) else getattr(method, '__name__', type(method).__name__)
+
+
+class WebDriverWait(_WebDriverWait):
+    """
+    WebDriverWait that records the time spent waiting when the driver is being traced
+    """
+    def until(self, method, message=''):
+        tracer = getattr(self._driver, 'tracer', None)
+        if tracer is None:
+            return super().until(method, message)
+
+        with tracer.span('wait', describe(method)):
+            return super().until(method, message)
+
+    def until_not(self, method, message=''):
+        tracer = getattr(self._driver, 'tracer', None)
+        if tracer is None:
+            return super().until_not(method, message)
+
+        with tracer.span('wait', describe(method)):
+            return super().until_not(method, message)
@@ -1,9 +1,18 @@
-from time import sleep
-from typing import List, Callable, Dict
+from typing import List, Callable, Dict, Tuple
 from functools import wraps
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import defaultdict
+from argparse import ArgumentTypeError
 from utils.courses.courses import HighSchoolCourse, CollegeCourse
+from utils.courses.cache import CourseIndex
+from utils.driver import Driver, PROFILES
+from utils.downloads import tracker_for, download_directory
+from utils.trace import Tracer
+from utils.canvas import normalize_name, split_link
+from utils.session import SessionStore
+from utils.tabs import TabPool
+from utils.recycle import Recycler, RecyclePolicy
+from utils.retry import Quarantine, RetryPolicy
 import shutil
 import pandas as pd
 import os
@@ -14,28 +23,60 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 
 
-def login(driver, url):
+def login(driver, url, store: 'SessionStore' = None):
+    # reuse the saved session while canvas still accepts it
+    if store is not None:
+        base, _ = split_link(url)
+        cookies = store.load()
+        if cookies is not None and store.valid(base, cookies):
+            driver.load_cookies(cookies, url)
+            return
+
     # get login page
     driver.get(url)
 
     # wait for manual login
     WebDriverWait(driver, 35).until(EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'UT COLLEGE')]")))
 
+    if store is not None:
+        store.save(driver.get_cookies())
+
+
+def get_download_tracker(driver: 'Driver') -> 'DownloadTracker':
+    # one tracker per download directory, shared by every driver downloading into it
+    if getattr(driver, 'downloads', None) is None:
+        driver.downloads = tracker_for(download_directory(driver.download_directory))
+
+    return driver.downloads
+
+
+def get_quarantine(driver: 'Driver') -> 'Quarantine':
+    # drivers started without the retry arguments still retry, they just don't write a failure manifest
+    if driver.quarantine is None:
+        driver.quarantine = Quarantine()
+
+    return driver.quarantine
+
 
 def download_manager(func):
 
     @wraps(func)
     def inner(*args, **kwargs):
-        # preprocessing
+        # preprocessing, match is part of the expected file name, e.g. the course name
         driver = args[0]
-        size = len(os.listdir(driver.download_directory))
+        tracker = get_download_tracker(driver)
+        key = object()
+        tracker.expect(key, kwargs.pop('match', None))
 
-        # run scraper
-        func(*args, **kwargs)
+        # run scraper, a download that was never triggered mustn't keep waiting for a file
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            tracker.cancel(key)
+            raise
 
-        # wait for download to start
-        while len(os.listdir(driver.download_directory)) == size:
-            sleep(0.05)
+        # wait for the download to be complete and renamed
+        return tracker.wait(key)
 
     return inner
 
@@ -59,6 +100,126 @@ def get_course_type():
     return course
 
 
+def add_api_argument(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--api', action='store_true', help='discover every course of the account through the canvas api, page numbers are ignored')
+
+
+def add_cache_arguments(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--cache', action='store_true', help='reuse courses discovered by earlier runs')
+    parser.add_argument('--ttl', type=float, default=168, help='hours before cached courses are discovered again')
+    parser.add_argument('--refresh', type=int, default=0, help='number of pages, up to the last one with courses, to always re-check along with the page after it')
+
+
+def add_profile_argument(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--profile', choices=PROFILES, default='default', help='browser profile, e.g. fast blocks images, fonts and media')
+
+
+def add_prefetch_argument(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--prefetch', type=int, default=0, help='number of upcoming course pages to preload in background tabs')
+
+
+def use_tab_pool(driver: 'Driver', args: 'Namespace') -> None:
+    if args.prefetch:
+        driver.tabs = TabPool(driver, args.prefetch)
+
+
+def add_session_argument(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--remember', action='store_true', help='save the login to an encrypted file and reuse it while it is valid')
+
+
+def get_session_store(args: 'Namespace') -> 'SessionStore':
+    return SessionStore() if args.remember else None
+
+
+def add_trace_argument(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--trace', help='JSONL file to record the timing of every page load, wait, find and click')
+
+
+def use_tracer(driver: 'Driver', args: 'Namespace') -> None:
+    if args.trace:
+        driver.tracer = Tracer(args.trace)
+
+
+def add_recycle_arguments(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--max-rss', type=float, default=0, help='MB of browser memory after which the browser is restarted')
+    parser.add_argument('--max-pages', type=int, default=0, help='number of page loads after which the browser is restarted')
+
+
+def use_recycler(driver: 'Driver', args: 'Namespace') -> None:
+    if args.max_rss or args.max_pages:
+        driver.recycler = Recycler(RecyclePolicy(max_rss_mb=args.max_rss, max_pages=args.max_pages))
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError(f"{value} is not at least 1")
+
+    return number
+
+
+def add_retry_arguments(parser: 'ArgumentParser') -> None:
+    parser.add_argument('--attempts', type=positive_int, default=3, help='tries for each student or submission before it is skipped, 1 for no retries')
+    parser.add_argument('--failures', help='file listing everything that failed, for --only-failed, defaults to next to --journal')
+    parser.add_argument('--only-failed', help='failure file of an earlier run, only its courses, students and submissions are retried')
+
+
+def use_quarantine(driver: 'Driver', args: 'Namespace') -> None:
+    # failures are only written to disk when asked for, or next to the journal of a resumable run
+    path = args.failures
+    if path is None and getattr(args, 'journal', None):
+        path = os.path.splitext(args.journal)[0] + '.failures.json'
+    driver.quarantine = Quarantine(RetryPolicy(attempts=args.attempts), path=path, previous=args.only_failed)
+
+
+def add_run_arguments(parser: 'ArgumentParser') -> None:
+    # the arguments every script shares, start_run and finish_run act on them
+    add_api_argument(parser)
+    parser.add_argument('--journal', help='file recording finished work so an interrupted run can resume')
+    add_cache_arguments(parser)
+    add_profile_argument(parser)
+    add_trace_argument(parser)
+    add_session_argument(parser)
+    add_prefetch_argument(parser)
+    add_recycle_arguments(parser)
+    add_retry_arguments(parser)
+
+
+def start_run(args: 'Namespace', *urls: str, target_dir: str = '') -> 'Driver':
+    """
+    Starts the browser set up by the arguments of add_run_arguments and logs it in to every url
+    """
+    driver = Driver.initialize(target_dir, args.profile)
+    use_tracer(driver, args)
+    store = get_session_store(args)
+    for url in urls:
+        login(driver, url, store)
+    use_tab_pool(driver, args)
+    use_recycler(driver, args)
+    use_quarantine(driver, args)
+
+    return driver
+
+
+def finish_run(driver: 'Driver') -> None:
+    # write out the timings and report the recycled browsers and everything that failed
+    if driver.tracer is not None:
+        driver.tracer.close()
+    if driver.recycler is not None:
+        driver.recycler.report()
+    driver.quarantine.close()
+
+
+def get_course_index(args: 'Namespace') -> 'CourseIndex':
+    return CourseIndex(ttl=args.ttl * 3600, refresh=args.refresh) if args.cache else None
+
+
+def use_course_index(course: 'Course', args: 'Namespace') -> None:
+    # attach the on-disk index so get_links can skip discovery
+    if args.cache:
+        course.index = get_course_index(args)
+
+
 def get_unit_number():
     # get unit number for grading purposes from stdin
     unit = input("Enter the unit number: ").strip()
@@ -113,9 +274,14 @@ def get_assignments():
     return res
 
 
-def get_range():
-    # get range
+def get_range(api: bool = False):
+    # the api lists every course of the account, so there are no pages to choose from
     print()
+    if api:
+        print("Page numbers are ignored with --api, every course of the account is used.")
+        return None
+
+    # get range
     start = int(input("Enter the first page number of the desired courses: "))
     end = int(input("Enter the last page number of the desired courses: "))
 
@@ -125,32 +291,91 @@ def get_range():
 class Student:
     first: str
     last: str
-    multiplier: str
+    multiplier: float
+
+
+COLUMNS = ['College Course', 'Student First Name', 'Student Last Name', 'Accommodation Request']
+
+
+def parse_multipliers(requests: 'pd.Series') -> 'pd.Series':
+    """
+    Parses the time multiplier in parentheses out of every accommodation request, e.g. (1.5), (1.5x), (3/2) or (150%)
+    """
+    raw = requests.str.extract(r'\(([^)]*)\)', expand=False).str.strip().str.rstrip('xX').str.strip()
+
+    percent = raw.str.endswith('%', na=False)
+    fraction = raw.str.contains('/', na=False, regex=False)
 
+    multipliers = pd.to_numeric(raw.where(~percent & ~fraction), errors='coerce')
+    multipliers = multipliers.fillna(pd.to_numeric(raw.where(percent).str.rstrip('%'), errors='coerce') / 100)
+    if fraction.any():
+        parts = raw.where(fraction).str.split('/', n=1, expand=True)
+        multipliers = multipliers.fillna(pd.to_numeric(parts[0], errors='coerce') / pd.to_numeric(parts[1], errors='coerce'))
 
-def get_students():
-    # dictionary of students
-    students = defaultdict(list)
+    # a zero denominator divides to infinity rather than failing
+    return multipliers.replace([float('inf'), float('-inf')], float('nan'))
 
+
+@dataclass
+class StudentIndex:
+    by_course: Dict[str, List[Student]] = field(default_factory=lambda: defaultdict(list))
+    by_name: Dict[str, List[Tuple[str, Student]]] = field(default_factory=lambda: defaultdict(list))
+    rejected: List[Tuple[int, str]] = field(default_factory=list)
+
+    def lookup(self, first: str, last: str, course: str = None) -> List[Student]:
+        matches = self.by_name.get(normalize_name(first, last), [])
+        return [student for name, student in matches if course is None or name == course]
+
+    def add_frame(self, df: 'pd.DataFrame') -> None:
+        """
+        Parses a frame (or chunk) of the accommodations csv into the index
+        """
+        # only extended time requests carry a multiplier
+        requests = df['Accommodation Request'].fillna('').astype(str)
+        df = df[requests.str.startswith("Extended time")]
+        multipliers = parse_multipliers(requests[df.index])
+
+        # reject malformed rows with the line number they have in the csv
+        missing = df[['College Course', 'Student First Name', 'Student Last Name']].isna().any(axis=1)
+        invalid = multipliers.isna() | (multipliers < 1)
+        for i in df.index[missing]:
+            self.rejected.append((i + 2, "missing course or student name"))
+        for i in df.index[~missing & invalid]:
+            self.rejected.append((i + 2, f"invalid time multiplier in '{requests[i]}'"))
+
+        valid = ~missing & ~invalid
+        for course, first, last, multiplier in zip(df['College Course'][valid], df['Student First Name'][valid], df['Student Last Name'][valid], multipliers[valid]):
+            student = Student(first=first, last=last, multiplier=float(multiplier))
+            self.by_course[course].append(student)
+            self.by_name[normalize_name(first, last)].append((course, student))
+
+
+def load_students(path: str, chunksize: int = None) -> StudentIndex:
+    """
+    Loads the accommodations csv into a per-course index, streaming it in chunks for very large files
+    """
+    index = StudentIndex()
+    if chunksize:
+        for chunk in pd.read_csv(path, usecols=COLUMNS, chunksize=chunksize):
+            index.add_frame(chunk)
+    else:
+        index.add_frame(pd.read_csv(path, usecols=COLUMNS))
+
+    return index
+
+
+def get_students(chunksize: int = None):
     # get filename
     print()
     filename = input("Enter the filename of the accommodations csv: ")
     print()
 
     # get dataframe
-    df = pd.read_csv(f"{os.path.dirname(sys.executable)}/{filename}")
-    # df = pd.read_csv(filename)
-
-    # parse through students
-    for i, row in df.iterrows():
-        if not row['Accommodation Request'].startswith("Extended time"):
-            continue
-
-        # parse through accommodation to get time multipler
-        accom = row['Accommodation Request'].split(" ")
-        multiplier = accom[5][1:-1]
+    index = load_students(f"{os.path.dirname(sys.executable)}/{filename}", chunksize)
+    # index = load_students(filename, chunksize)
 
-        # create new instance of a student
-        students[row['College Course']].append(Student(first=row['Student First Name'], last=row['Student Last Name'], multiplier=multiplier))
+    # report rows that couldn't be parsed
+    for row, reason in index.rejected:
+        print(f"Skipping row {row}: {reason}")
 
-    return students
\ No newline at end of file
+    return index.by_course
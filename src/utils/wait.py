@@ -0,0 +1,90 @@
+from typing import Dict, Tuple, Callable, Any
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from threading import Lock
+from time import sleep, perf_counter
+from utils.trace import percentile
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+
+class AdaptiveWait:
+    """
+    Waits that learn how long each selector usually takes and check alternative conditions in the same polling loop
+    """
+    def __init__(self, floor: float = 1.0, factor: float = 3.0, min_samples: int = 20, poll: float = 0.05, history: int = 200):
+        self.floor = floor
+        self.factor = factor
+        self.min_samples = min_samples
+        self.poll = poll
+        self.samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=history))
+        self.timeouts: Dict[str, int] = defaultdict(int)
+        self.lock = Lock()
+
+    def timeout(self, key: str, ceiling: float) -> float:
+        # use the hard-coded timeout until there's enough history to trust the percentiles
+        samples = list(self.samples[key])
+        if len(samples) < self.min_samples:
+            return ceiling
+
+        return min(ceiling, max(self.floor, percentile(samples, 95) * self.factor))
+
+    def until_any(self, driver: 'Driver', conditions: Dict[str, Callable], ceiling: float, key: str = None, probe: bool = False) -> Tuple[str, Any]:
+        """
+        Polls every condition each tick and returns the name and result of the first one met,
+        a probe checks for something that may legitimately be absent so it always waits the full ceiling
+        """
+        key = key or '|'.join(conditions)
+        # a probe that timed out early would turn a slow page into a skipped course
+        timeout = ceiling if probe else self.timeout(key, ceiling)
+        tracer = getattr(driver, 'tracer', None)
+
+        with tracer.span('wait', key) if tracer is not None else nullcontext():
+            start = perf_counter()
+            while True:
+                for name, condition in conditions.items():
+                    try:
+                        result = condition(driver)
+                    except (NoSuchElementException, StaleElementReferenceException):
+                        result = False
+
+                    if result:
+                        with self.lock:
+                            self.samples[key].append(perf_counter() - start)
+                        return name, result
+
+                if perf_counter() - start >= timeout:
+                    with self.lock:
+                        self.timeouts[key] += 1
+                    raise TimeoutException(f"None of {list(conditions)} met within {timeout:.2f}s")
+
+                sleep(self.poll)
+
+    def until(self, driver: 'Driver', key: str, condition: Callable, ceiling: float, probe: bool = False) -> Any:
+        return self.until_any(driver, {key: condition}, ceiling, key, probe)[1]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the observed latency percentiles, timeout count and current timeout by selector
+        """
+        with self.lock:
+            keys = set(self.samples) | set(self.timeouts)
+            return {
+                key: {
+                    'count': len(self.samples[key]),
+                    'p50': round(percentile(list(self.samples[key]), 50), 3) if self.samples[key] else None,
+                    'p95': round(percentile(list(self.samples[key]), 95), 3) if self.samples[key] else None,
+                    'timeouts': self.timeouts[key],
+                    'timeout': None if len(self.samples[key]) < self.min_samples else round(self.timeout(key, float('inf')), 3),
+                }
+                for key in sorted(keys)
+            }
+
+    def report(self) -> None:
+        print(f"{'selector':<40}{'count':>8}{'p50':>8}{'p95':>8}{'timeouts':>10}")
+        for key, stats in self.stats().items():
+            print(f"{key:<40}{stats['count']:>8}{str(stats['p50']):>8}{str(stats['p95']):>8}{stats['timeouts']:>10}")
+
+
+# shared by the scripts so every course benefits from what earlier courses observed
+waits = AdaptiveWait()
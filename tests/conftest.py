@@ -0,0 +1,21 @@
+import sys
+import os
+
+import pytest
+
+# the scripts import their helpers as top level packages from src, the mock canvas server lives in bench
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bench'))
+
+from mock_canvas import serve, Config
+
+
+@pytest.fixture
+def mock_canvas():
+    """
+    Yields the base url and state of a fresh mock canvas server
+    """
+    server, canvas = serve(Config(courses=3, students=5, export_delay=0.05))
+    yield f"http://127.0.0.1:{server.server_port}", canvas
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from mock_canvas import QUIZ
+from accommodate import add_accommodations_bulk, sync_accommodations
+from utils.api import session_from_cookies
+from utils.courses.course_utils import CourseDescriptor
+from utils.journal import Journal
+from utils.utils import Assignment, Student
+
+
+@pytest.fixture
+def course(mock_canvas):
+    base, canvas = mock_canvas
+    course = next(iter(canvas.courses.values()))
+    course_link = CourseDescriptor(course.name, f"{base}/courses/{course.id}")
+    quiz_link = f"{base}/courses/{course.id}/quizzes/{course.quiz_id}"
+
+    return course, course_link, quiz_link
+
+
+def test_bulk_adds_every_extension_at_once(course):
+    course, course_link, quiz_link = course
+    students = [Student(first, last, 1.5) for _, first, last in course.students[:3]] + [Student('Not', 'Enrolled', 2)]
+
+    missing = add_accommodations_bulk(session_from_cookies([]), course_link, [quiz_link], [Assignment(QUIZ, 60)], students)
+
+    assert missing == [Student('Not', 'Enrolled', 2)]
+    assert course.extensions == {(course.quiz_id, user_id): 30 for user_id, _, _ in course.students[:3]}
+
+
+def test_bulk_skips_journaled_assignments(course, tmp_path):
+    course, course_link, quiz_link = course
+    journal = Journal(str(tmp_path / 'journal.jsonl'))
+    journal.record(quiz_link, 'accommodate')
+
+    add_accommodations_bulk(session_from_cookies([]), course_link, [quiz_link], [Assignment(QUIZ, 60)], [Student(course.students[0][1], course.students[0][2], 1.5)], journal=journal)
+
+    assert course.extensions == {}
+    journal.close()
+
+
+def test_sync_only_submits_what_changed(course):
+    course, course_link, quiz_link = course
+    (first_id, first, last), (second_id, second_first, second_last), (third_id, _, _) = course.students[:3]
+    course.extensions = {(course.quiz_id, first_id): 30, (course.quiz_id, second_id): 15, (course.quiz_id, third_id): 45}
+    students = [Student(first, last, 1.5), Student(second_first, second_last, 2), Student(course.students[3][1], course.students[3][2], 1.25), Student('Not', 'Enrolled', 2)]
+
+    report = sync_accommodations(session_from_cookies([]), course_link, [quiz_link], [Assignment(QUIZ, 60)], students)
+
+    assert (report.added, report.changed, report.unchanged) == (1, 1, 1)
+    assert report.drift == [(quiz_link, third_id, 45)]
+    assert report.missing == [Student('Not', 'Enrolled', 2)]
+    assert course.extensions[(course.quiz_id, second_id)] == 60
+    assert course.extensions[(course.quiz_id, course.students[3][0])] == 15
+
+    # a second sync finds nothing to do
+    report = sync_accommodations(session_from_cookies([]), course_link, [quiz_link], [Assignment(QUIZ, 60)], students)
+    assert (report.added, report.changed, report.unchanged) == (0, 0, 3)
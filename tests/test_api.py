@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip('requests')
+
+from mock_canvas import ACCOUNT
+from utils.api import CanvasClient, Throttle, get_all, session_from_cookies
+
+
+def client() -> CanvasClient:
+    # a throttle of its own so tests don't share the rate limit state, and no waiting between retries
+    return CanvasClient(retries=2, backoff=0, throttle=Throttle())
+
+
+def test_get_all_follows_the_next_links(mock_canvas):
+    base, canvas = mock_canvas
+    requests = canvas.requests
+
+    courses = list(get_all(session_from_cookies([]), f"{base}/api/v1/accounts/{ACCOUNT}/courses", params={'per_page': 2}))
+
+    assert [course['name'] for course in courses] == [course.name for course in canvas.courses.values()]
+    assert canvas.requests - requests == 2
+
+
+def test_get_all_keeps_the_query_of_the_first_page(mock_canvas):
+    base, canvas = mock_canvas
+    courses = list(get_all(session_from_cookies([]), f"{base}/api/v1/accounts/{ACCOUNT}/courses", params={'per_page': 1, 'search_term': 'Course 002'}))
+
+    assert [course['name'] for course in courses] == ['UT COLLEGE Course 002']
+
+
+def test_server_errors_of_reads_are_retried(mock_canvas):
+    base, canvas = mock_canvas
+    session = client()
+    canvas.faults = [503, 502]
+
+    response = session.get(f"{base}/api/v1/accounts/{ACCOUNT}/courses")
+
+    assert response.status_code == 200
+    assert session.metrics.retries == 2
+
+
+def test_server_errors_of_writes_are_not_retried(mock_canvas):
+    base, canvas = mock_canvas
+    session = client()
+    course = next(iter(canvas.courses.values()))
+    canvas.faults = [503]
+
+    response = session.post(f"{base}/api/v1/courses/{course.id}/quizzes/{course.quiz_id}/extensions", json={'quiz_extensions': []})
+
+    assert response.status_code == 503
+    assert session.metrics.retries == 0
+
+
+@pytest.mark.parametrize('status', [403, 429])
+def test_throttled_writes_are_retried(mock_canvas, status):
+    base, canvas = mock_canvas
+    session = client()
+    course = next(iter(canvas.courses.values()))
+    canvas.faults = [status]
+
+    response = session.post(f"{base}/api/v1/courses/{course.id}/quizzes/{course.quiz_id}/extensions", json={'quiz_extensions': [{'user_id': course.students[0][0], 'extra_time': 30}]})
+
+    assert response.status_code == 200
+    assert course.extensions == {(course.quiz_id, course.students[0][0]): 30}
+
+
+def test_retries_give_up_with_the_last_response(mock_canvas):
+    base, canvas = mock_canvas
+    session = client()
+    canvas.faults = [503, 503, 503]
+
+    assert session.get(f"{base}/api/v1/accounts/{ACCOUNT}/courses").status_code == 503
+    assert session.metrics.retries == 2
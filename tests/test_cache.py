@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from utils.courses.cache import CourseIndex
+from utils.courses.course_utils import CourseDescriptor
+from utils.courses.courses import CollegeCourse
+
+
+URL = 'https://canvas/accounts/1?'
+
+
+class ListingPages(CollegeCourse):
+    """
+    Serves the listing pages from a dict instead of a browser and counts how often each one is scraped
+    """
+    def __init__(self, pages):
+        self.pages = pages
+        self.scraped = []
+
+    def _parse_page(self, driver, url, course):
+        page = int(url.rsplit('=', 1)[1])
+        self.scraped.append(page)
+        return self.pages.get(page, [])
+
+
+def test_trailing_empty_pages_are_cached(tmp_path):
+    pages = {1: [CourseDescriptor('UT COLLEGE Algebra 1', 'https://canvas/courses/1000001')], 3: [CourseDescriptor('UT COLLEGE Algebra 2', 'https://canvas/courses/1000002')]}
+
+    course = ListingPages(pages)
+    course.index = CourseIndex(str(tmp_path / 'courses.json'))
+    assert len(course.get_links(None, URL, range(1, 6))) == 2
+    assert course.scraped == [1, 2, 3, 4, 5]
+
+    # the empty page in the middle may have timed out, the ones past the end are known to be empty
+    course = ListingPages(pages)
+    course.index = CourseIndex(str(tmp_path / 'courses.json'))
+    assert len(course.get_links(None, URL, range(1, 6))) == 2
+    assert course.scraped == [2]
+
+
+def test_nothing_is_cached_when_every_page_is_empty(tmp_path):
+    course = ListingPages({})
+    course.index = CourseIndex(str(tmp_path / 'courses.json'))
+    course.get_links(None, URL, range(1, 3))
+
+    course = ListingPages({})
+    course.index = CourseIndex(str(tmp_path / 'courses.json'))
+    course.get_links(None, URL, range(1, 3))
+    assert course.scraped == [1, 2]
+
+
+def test_refresh_counts_back_from_the_last_page_with_courses(tmp_path):
+    pages = {1: [CourseDescriptor('UT COLLEGE Algebra 1', 'https://canvas/courses/1000001')], 2: [CourseDescriptor('UT COLLEGE Algebra 2', 'https://canvas/courses/1000002')]}
+
+    course = ListingPages(pages)
+    course.index = CourseIndex(str(tmp_path / 'courses.json'), refresh=1)
+    assert len(course.get_links(None, URL, range(1, 5))) == 2
+
+    # new sections fill up the last page and spill over onto the next one
+    pages[2] = pages[2] + [CourseDescriptor('UT COLLEGE Algebra 3', 'https://canvas/courses/1000003')]
+    pages[3] = [CourseDescriptor('UT COLLEGE Algebra 4', 'https://canvas/courses/1000004')]
+
+    course = ListingPages(pages)
+    course.index = CourseIndex(str(tmp_path / 'courses.json'), refresh=1)
+    assert len(course.get_links(None, URL, range(1, 5))) == 4
+    assert course.scraped == [2, 3]
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from mock_canvas import ACCOUNT
+from utils.api import session_from_cookies
+from utils.courses.cache import CourseIndex
+from utils.courses.courses import CollegeCourse, HighSchoolCourse
+
+
+def test_api_links_list_every_course_of_the_account(mock_canvas):
+    base, canvas = mock_canvas
+    url = f"{base}/accounts/{ACCOUNT}?"
+
+    links = CollegeCourse().get_api_links(session_from_cookies([]), url, CollegeCourse)
+
+    assert [(link.name, link.link) for link in links] == [(course.name, f"{base}/courses/{course.id}") for course in canvas.courses.values()]
+    assert CollegeCourse().get_api_links(session_from_cookies([]), url, HighSchoolCourse) == []
+
+
+def test_api_links_are_cached(mock_canvas, tmp_path):
+    base, canvas = mock_canvas
+    url = f"{base}/accounts/{ACCOUNT}?"
+    course = CollegeCourse()
+    course.index = CourseIndex(str(tmp_path / 'courses.json'))
+
+    links = course.get_api_links(session_from_cookies([]), url, CollegeCourse)
+    requests = canvas.requests
+
+    assert course.get_api_links(session_from_cookies([]), url, CollegeCourse) == links
+    assert canvas.requests == requests
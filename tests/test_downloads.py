@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.downloads import DownloadTracker
+
+
+def test_files_go_to_the_download_of_their_course(tmp_path):
+    tracker = DownloadTracker(str(tmp_path))
+    tracker.expect('algebra 1', 'UT COLLEGE Algebra 1')
+    tracker.expect('algebra 10', 'UT COLLEGE Algebra 10')
+
+    (tmp_path / '2020-11-05T1234_Grades-UT_COLLEGE_Algebra_10.csv').write_text('Student')
+    (tmp_path / '2020-11-05T1235_Grades-UT_COLLEGE_Algebra_1.csv').write_text('Student')
+
+    assert tracker.wait('algebra 10', timeout=5).endswith('Algebra_10.csv')
+    assert tracker.wait('algebra 1', timeout=5).endswith('Algebra_1.csv')
+    tracker.close()
+
+
+def test_unexpected_name_falls_back_to_the_oldest_download(tmp_path):
+    tracker = DownloadTracker(str(tmp_path))
+    tracker.expect('algebra', 'UT COLLEGE Algebra 1')
+
+    (tmp_path / '.com.google.Chrome.abc123').write_text('')
+    (tmp_path / 'Grades-Renamed.csv').write_text('Student')
+
+    assert tracker.wait('algebra', timeout=5).endswith('Grades-Renamed.csv')
+    tracker.close()
+
+
+def test_failed_trigger_does_not_take_the_next_file(tmp_path):
+    pytest.importorskip('selenium')
+    from utils.utils import download_manager
+
+    tracker = DownloadTracker(str(tmp_path))
+    driver = SimpleNamespace(downloads=tracker)
+
+    @download_manager
+    def export(driver, filename):
+        if filename is None:
+            raise TimeoutError("Export button never showed up")
+        (tmp_path / filename).write_text('Student')
+
+    with pytest.raises(TimeoutError):
+        export(driver, None, match='UT COLLEGE Algebra 1')
+
+    # canvas names the file after the course code, so it only matches through the fallback
+    assert export(driver, 'Grades-ALG2.csv', match='UT COLLEGE Algebra 2').endswith('Grades-ALG2.csv')
+    assert tracker.pending == [] and tracker.finished == {}
+    tracker.close()
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip('requests')
+
+from utils.api import session_from_cookies
+from utils.courses.course_utils import CourseDescriptor
+from utils.export import GradebookExporter, course_from_filename
+
+
+def test_exports_every_course(mock_canvas, tmp_path):
+    base, canvas = mock_canvas
+    course_links = [CourseDescriptor(course.name, f"{base}/courses/{course.id}") for course in canvas.courses.values()]
+
+    results = GradebookExporter(session_from_cookies([]), str(tmp_path), concurrency=2, poll=0.01).run(course_links)
+
+    for course, course_link in zip(canvas.courses.values(), course_links):
+        path = results[course_link.link]
+        assert course_from_filename(path.rsplit('/', 1)[1]) == course_from_filename(f"{course.name}.csv")
+        with open(path) as f:
+            assert len(f.read().splitlines()) == len(course.students) + 1
+    assert not list(tmp_path.glob('*.part'))
+
+
+def test_failed_exports_are_returned_with_the_rest(mock_canvas, tmp_path):
+    base, canvas = mock_canvas
+    course = next(iter(canvas.courses.values()))
+    course_links = [CourseDescriptor(course.name, f"{base}/courses/{course.id}"), CourseDescriptor('UT COLLEGE Missing', f"{base}/courses/404")]
+
+    results = GradebookExporter(session_from_cookies([]), str(tmp_path), poll=0.01).run(course_links)
+
+    assert results[course_links[0].link].endswith('.csv')
+    assert isinstance(results[course_links[1].link], Exception)
+
+
+@pytest.mark.parametrize('filename, course', [
+    ('2020-11-05T1234_Grades-UT_COLLEGE_Algebra_1.csv', 'ut_college_algebra_1'),
+    ('2020-11-05T1234_Grades-UT_COLLEGE_Algebra_1 (1).csv', 'ut_college_algebra_1'),
+    ('UT COLLEGE Algebra 10.csv', 'ut_college_algebra_10'),
+])
+def test_course_from_filename(filename, course):
+    assert course_from_filename(filename) == course
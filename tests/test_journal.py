@@ -0,0 +1,37 @@
+from utils.journal import Journal
+
+
+def test_records_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path)
+    journal.record('https://canvas/courses/1', 'download')
+    journal.close()
+
+    journal = Journal(path)
+    assert ('https://canvas/courses/1', 'download') in journal
+    assert ('https://canvas/courses/1', 'survey') not in journal
+    journal.close()
+
+
+def test_torn_line_is_cut_before_the_next_record(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text('["a", "1"]\n["b", "2')
+
+    journal = Journal(str(path))
+    assert ('a', '1') in journal
+    assert ('b', '2') not in journal
+    journal.record('c', '3')
+    journal.close()
+
+    assert path.read_text() == '["a", "1"]\n["c", "3"]\n'
+    journal = Journal(str(path))
+    assert ('c', '3') in journal
+    journal.close()
+
+
+def test_keys_are_compared_as_strings(tmp_path):
+    journal = Journal(str(tmp_path / 'journal.jsonl'))
+    journal.record('https://canvas/courses/1', 'regrade', 42)
+    assert ('https://canvas/courses/1', 'regrade', '42') in journal
+    assert ('https://canvas/courses/1', 'regrade', 42) in journal
+    journal.close()
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from mock_canvas import REGRADE
+from regrade import fudge_points, regrade_course
+from utils.api import session_from_cookies
+from utils.journal import Journal
+
+
+@pytest.mark.parametrize('total, current_fudge, expected', [
+    (90, 0, 10),
+    (45, 0, 5),
+    (0, 0, 0),
+    (8.5, 0, 0.94),
+])
+def test_fudge_points_curve_the_raw_score_by_ten_ninths(total, current_fudge, expected):
+    assert fudge_points(total, current_fudge) == expected
+
+
+def test_fudge_points_ignore_fudge_already_applied():
+    # a score of 100 that already includes 10 fudge points is curved from its raw 90 again
+    assert fudge_points(100, 10) == 10
+    assert fudge_points(100, 10) == fudge_points(90, 0)
+
+
+def test_regrade_course_curves_submissions_without_credit_on_question_one(mock_canvas, tmp_path):
+    base, canvas = mock_canvas
+    course = next(iter(canvas.courses.values()))
+    course_link = f"{base}/courses/{course.id}"
+    raw = {user_id: submission.score for user_id, submission in course.submissions.items()}
+    curved = {user_id for user_id, submission in course.submissions.items() if submission.question_points == 0}
+    journal = Journal(str(tmp_path / 'journal.jsonl'))
+
+    changed = regrade_course(session_from_cookies([]), course_link, REGRADE, journal=journal)
+
+    assert changed == len([user_id for user_id in curved if fudge_points(raw[user_id], 0)])
+    for user_id, submission in course.submissions.items():
+        assert submission.fudge_points == (fudge_points(raw[user_id], 0) if user_id in curved else 0)
+        assert ((course_link, 'regrade', user_id) in journal) == (user_id in curved)
+
+    # already curved submissions are left alone
+    journal.close()
+    assert regrade_course(session_from_cookies([]), course_link, REGRADE) == 0
@@ -0,0 +1,73 @@
+from argparse import ArgumentTypeError
+import json
+
+import pytest
+
+pytest.importorskip('selenium')
+
+from utils.retry import Quarantine, RetryPolicy
+from utils.utils import positive_int
+
+
+@pytest.fixture
+def quarantine(tmp_path):
+    path = tmp_path / 'failures.json'
+    failures = [
+        {'kind': 'course', 'key': ['https://canvas/courses/1', 'download'], 'error': 'TimeoutException: ', 'transient': True},
+        {'kind': 'student', 'key': ['https://canvas/courses/2', 'accommodate', 'Quiz 1', 'Ada', 'Lovelace'], 'error': 'NoSuchElementException: ', 'transient': False},
+        {'kind': 'course', 'key': ['https://canvas/accounts/3', 'discover'], 'error': 'TimeoutException: ', 'transient': True},
+    ]
+    path.write_text(json.dumps({'failures': failures}))
+
+    return Quarantine(previous=str(path))
+
+
+def test_everything_is_selected_without_a_previous_run():
+    quarantine = Quarantine()
+    assert quarantine.selected('https://canvas/courses/1', 'download')
+    assert not quarantine.retrying('https://canvas/accounts/3', 'discover')
+
+
+def test_failed_course_selects_only_its_task(quarantine):
+    assert quarantine.selected('https://canvas/courses/1')
+    assert quarantine.selected('https://canvas/courses/1', 'download')
+    assert not quarantine.selected('https://canvas/courses/1', 'survey')
+    assert not quarantine.selected('https://canvas/courses/4', 'download')
+
+
+def test_failed_student_selects_its_course_but_not_other_students(quarantine):
+    assert quarantine.selected('https://canvas/courses/2', 'accommodate')
+    assert quarantine.selected('https://canvas/courses/2', 'accommodate', 'Quiz 1', 'Ada', 'Lovelace')
+    assert not quarantine.selected('https://canvas/courses/2', 'accommodate', 'Quiz 1', 'Grace', 'Hopper')
+    assert not quarantine.selected('https://canvas/courses/2', 'accommodate', 'Quiz 2')
+
+
+def test_retrying_only_matches_failed_units(quarantine):
+    assert quarantine.retrying('https://canvas/accounts/3', 'discover')
+    assert not quarantine.retrying('https://canvas/accounts/4', 'discover')
+
+
+def test_parts_are_compared_as_strings(tmp_path):
+    path = tmp_path / 'failures.json'
+    path.write_text(json.dumps({'failures': [{'kind': 'submission', 'key': ['https://canvas/courses/1', 'regrade', '7'], 'error': '', 'transient': False}]}))
+
+    quarantine = Quarantine(previous=str(path))
+    assert quarantine.selected('https://canvas/courses/1', 'regrade', 7)
+    assert not quarantine.selected('https://canvas/courses/1', 'regrade', 8)
+
+
+@pytest.mark.parametrize('attempts', [0, -1])
+def test_work_always_runs_at_least_once(attempts):
+    calls = []
+    quarantine = Quarantine(RetryPolicy(attempts=attempts))
+
+    assert quarantine.run('student', ('https://canvas/courses/1', 'accommodate'), lambda: calls.append(1))
+    assert calls == [1]
+    assert RetryPolicy().call(lambda: calls.append(2), attempts=0) is None
+    assert calls == [1, 2]
+
+
+def test_attempts_below_one_are_rejected():
+    assert positive_int('1') == 1
+    with pytest.raises(ArgumentTypeError):
+        positive_int('0')
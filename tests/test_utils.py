@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+import pandas as pd
+
+from utils.utils import parse_multipliers
+
+
+@pytest.mark.parametrize('request_text, expected', [
+    ('Extended time (1.5)', 1.5),
+    ('Extended time (1.5x)', 1.5),
+    ('Extended time ( 2 X )', 2.0),
+    ('Extended time (3/2)', 1.5),
+    ('Extended time (150%)', 1.5),
+    ('Extended time (1)', 1.0),
+])
+def test_parse_multipliers(request_text, expected):
+    assert parse_multipliers(pd.Series([request_text]))[0] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('request_text', [
+    'Extended time',
+    'Extended time (double)',
+    'Extended time (3/0)',
+    'Extended time ()',
+])
+def test_malformed_multipliers_are_missing(request_text):
+    assert pd.isna(parse_multipliers(pd.Series([request_text]))[0])
+
+
+def test_parse_multipliers_keeps_the_index():
+    requests = pd.Series(['Extended time (2)', 'Extended time (50%)'], index=[4, 7])
+    assert parse_multipliers(requests).to_dict() == {4: 2.0, 7: 0.5}